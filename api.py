@@ -0,0 +1,376 @@
+"""
+Headless HTTP service for ingesting letters and extracting their schedule rows.
+
+    uvicorn api:app --host 0.0.0.0 --port 8000
+
+    curl --data-binary @surat.pdf -H "Content-Type: application/pdf" \
+        "localhost:8000/documents?filename=surat.pdf"
+    curl -X POST "localhost:8000/documents/<hash>/extract"
+    curl -X POST -H "Accept: application/x-ndjson" "localhost:8000/documents/<hash>/extract"
+    curl -o surat.pdf "localhost:8000/documents/<hash>/file"
+
+Work runs on a bounded asyncio queue drained by API_WORKERS workers. A full
+queue answers 503 with Retry-After instead of piling up requests, and
+identical requests in flight (same document, same model) share one job.
+Uploads are streamed to the spool directory (uploads.py) as they arrive and
+PyMuPDF opens them from there, so a request body is never held in memory.
+"""
+import os
+import re
+import json
+import time
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
+
+from functions import (
+    CHAT_MODEL, EXTRACTION_QUERY, OPENAI_API_KEY, OPENAI_BASE_URL,
+    astream_query_document, get_cached_vectorstore, get_ingestion_key,
+    ingest_pdf, invalidate_extraction_cache, touch_vectorstore
+)
+from tracing import logger, span, start_run
+from uploads import aspool_stream, find_spooled
+
+API_WORKERS = int(os.getenv("API_WORKERS", "4"))
+API_QUEUE_SIZE = int(os.getenv("API_QUEUE_SIZE", "32"))
+API_MAX_UPLOAD_MB = int(os.getenv("API_MAX_UPLOAD_MB", "50"))
+# Ingested documents kept ready for extraction; older ones are reloaded from Chroma
+API_DOCUMENT_CACHE_SIZE = int(os.getenv("API_DOCUMENT_CACHE_SIZE", "256"))
+# Chat models clients may ask for; each one gets its own client and result cache entries
+API_MODELS = [model.strip() for model in os.getenv("API_MODELS", CHAT_MODEL).split(",") if model.strip()]
+RETRY_AFTER_SECONDS = 2
+# Document ids are SHA-256 hex digests; anything else never reaches the spool, Chroma or the caches
+DOCUMENT_HASH_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+class Job:
+    """
+    One unit of work on the queue; concurrent identical requests share it.
+
+    Rows pushed while the job runs are fanned out to every subscriber of
+    iter_rows, and wait returns the final result.
+    """
+
+    def __init__(self, key, run):
+        self.key = key
+        self.run = run
+        self.rows = []
+        self.result = None
+        self.error = None
+        self.done = asyncio.Event()
+        self._updated = asyncio.Event()
+
+    def push(self, row):
+        self.rows.append(row)
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    def finish(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.done.set()
+        self._updated.set()
+
+    async def wait(self):
+        await self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    async def iter_rows(self):
+        index = 0
+        while True:
+            updated = self._updated
+            while index < len(self.rows):
+                yield self.rows[index]
+                index += 1
+            if self.done.is_set():
+                break
+            await updated.wait()
+        if self.error is not None:
+            raise self.error
+
+
+class ExtractionService:
+    """
+    Bounded job queue and worker pool around the functions.py pipeline.
+    """
+
+    def __init__(self, workers=API_WORKERS, queue_size=API_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queue = None
+        self.inflight = {}
+        self.vectorstores = OrderedDict()
+        self.stats = {"submitted": 0, "deduplicated": 0, "rejected": 0, "failed": 0}
+        self._tasks = []
+        self._llms = {}
+        self._async_client = None
+
+    async def start(self):
+        # Queue, events and the async HTTP client belong to the server's event loop
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._async_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=self.workers * 2, max_keepalive_connections=self.workers),
+            timeout=httpx.Timeout(60.0, connect=10.0)
+        )
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._async_client.aclose()
+
+    def get_llm(self, model):
+        from langchain_openai import ChatOpenAI
+        if model not in self._llms:
+            self._llms[model] = ChatOpenAI(
+                model=model,
+                api_key=OPENAI_API_KEY,
+                base_url=OPENAI_BASE_URL,
+                http_async_client=self._async_client,
+                stream_usage=True
+            )
+        return self._llms[model]
+
+    def submit(self, key, run):
+        """
+        Queue a job, or join the identical job already in flight.
+
+        :param key: Identifies identical work, e.g. ("extract", hash, model)
+        :param run: Coroutine function called with the Job by a worker
+
+        :return: The Job
+        """
+        job = self.inflight.get(key)
+        if job is not None:
+            self.stats["deduplicated"] += 1
+            return job
+        job = Job(key, run)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise ServiceBusy()
+        self.inflight[key] = job
+        self.stats["submitted"] += 1
+        return job
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                job.finish(result=await job.run(job))
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.warning("Job %s gagal: %s", job.key, e)
+                job.finish(error=e)
+            finally:
+                self.inflight.pop(job.key, None)
+                self.queue.task_done()
+
+    def remember(self, document_hash, vectorstore):
+        self.vectorstores[document_hash] = vectorstore
+        self.vectorstores.move_to_end(document_hash)
+        while len(self.vectorstores) > API_DOCUMENT_CACHE_SIZE:
+            self.vectorstores.popitem(last=False)
+
+    async def find_vectorstore(self, document_hash):
+        """
+        Return the ingested store of a document, or None if it was never uploaded.
+
+        Letters sent whole have no collection, so after an eviction from this
+        cache or a restart they are ingested again from the spooled upload,
+        through the queue like any other ingestion.
+
+        :raises ServiceBusy: When the document must be ingested again and the queue is full
+        """
+        vectorstore = self.vectorstores.get(document_hash)
+        if vectorstore is not None and not await asyncio.to_thread(touch_vectorstore, vectorstore):
+            # Its collection was deleted by gc; reload it or ingest again below
+            self.vectorstores.pop(document_hash, None)
+            vectorstore = None
+        if vectorstore is None:
+            vectorstore = await asyncio.to_thread(
+                get_cached_vectorstore, document_hash, get_ingestion_key(document_hash)
+            )
+        if vectorstore is None:
+            spooled = find_spooled(document_hash)
+            if spooled is None:
+                return None
+            job = self.submit(("ingest", document_hash), lambda job: self.ingest(job, spooled))
+            await job.wait()
+            return self.vectorstores.get(document_hash)
+        self.remember(document_hash, vectorstore)
+        return vectorstore
+
+    async def ingest(self, job, spooled):
+        document_hash = spooled.content_hash
+        with start_run("ingest", file=spooled.name) as run:
+            vectorstore = await asyncio.to_thread(ingest_pdf, spooled)
+        self.remember(document_hash, vectorstore)
+        return {"document_hash": document_hash, "status": "ready", "timings": run.to_rows()}
+
+    async def extract(self, job, document_hash, vectorstore, model):
+        with start_run("extract", document=document_hash) as run:
+            async for row in astream_query_document(
+                vectorstore, EXTRACTION_QUERY, model=model, llm=self.get_llm(model)
+            ):
+                job.push(row)
+        return {"document_hash": document_hash, "rows": job.rows, "timings": run.to_rows()}
+
+
+service = ExtractionService()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await service.start()
+    try:
+        yield
+    finally:
+        await service.stop()
+
+
+app = FastAPI(title="Pendataan Sound System & Multimedia", lifespan=lifespan)
+
+
+def check_document_hash(document_hash):
+    if not DOCUMENT_HASH_PATTERN.fullmatch(document_hash):
+        raise HTTPException(status_code=404, detail="Dokumen tidak ditemukan")
+
+
+def busy_error():
+    return HTTPException(
+        status_code=503,
+        detail="Antrian penuh, coba lagi nanti",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+    )
+
+
+@app.post("/documents")
+async def upload_document(request: Request, filename: str = "document.pdf"):
+    """
+    Ingest a PDF sent as the raw request body and return its content hash.
+    """
+    max_bytes = API_MAX_UPLOAD_MB * 1024 * 1024
+    too_large = HTTPException(status_code=413, detail=f"Ukuran file melebihi {API_MAX_UPLOAD_MB} MB")
+    if int(request.headers.get("content-length") or 0) > max_bytes:
+        raise too_large
+
+    async def checked_body():
+        # Content-Length may be missing or wrong, so the limit is enforced on what actually arrives
+        received = 0
+        header = b""
+        async for chunk in request.stream():
+            if len(header) < 4:
+                header += chunk[:4 - len(header)]
+                if len(header) >= 4 and header != b"%PDF":
+                    raise HTTPException(status_code=415, detail="Isi permintaan bukan file PDF")
+            received += len(chunk)
+            if received > max_bytes:
+                raise too_large
+            yield chunk
+        if header != b"%PDF":
+            raise HTTPException(status_code=415, detail="Isi permintaan bukan file PDF")
+
+    with span("upload_spool") as attrs:
+        spooled = await aspool_stream(checked_body(), filename)
+        attrs["bytes"] = spooled.size
+
+    document_hash = spooled.content_hash
+    if document_hash in service.vectorstores:
+        return {"document_hash": document_hash, "status": "ready", "timings": []}
+    try:
+        job = service.submit(
+            ("ingest", document_hash),
+            lambda job: service.ingest(job, spooled)
+        )
+    except ServiceBusy:
+        raise busy_error()
+    try:
+        return await job.wait()
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Gagal memproses PDF: {e}")
+
+
+@app.get("/documents/{document_hash}/file")
+async def download_document(document_hash: str, filename: str = "document.pdf"):
+    """
+    Stream an uploaded PDF back from the spool.
+    """
+    check_document_hash(document_hash)
+    spooled = find_spooled(document_hash)
+    if spooled is None:
+        raise HTTPException(status_code=404, detail="File tidak ditemukan")
+    return FileResponse(spooled.path, media_type="application/pdf", filename=filename)
+
+
+@app.post("/documents/{document_hash}/extract")
+async def extract_document(document_hash: str, request: Request, model: str = CHAT_MODEL,
+                           format: str = None, refresh: bool = False):
+    """
+    Extract the rows of an ingested document as JSON, or as NDJSON while the model writes them.
+
+    NDJSON is used when format=ndjson or the Accept header asks for application/x-ndjson.
+    """
+    check_document_hash(document_hash)
+    if model not in API_MODELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Model tidak didukung, pilih salah satu dari: {', '.join(API_MODELS)}"
+        )
+    try:
+        vectorstore = await service.find_vectorstore(document_hash)
+    except ServiceBusy:
+        raise busy_error()
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Gagal memproses PDF: {e}")
+    if vectorstore is None:
+        raise HTTPException(status_code=404, detail="Dokumen belum diunggah")
+    if refresh:
+        await asyncio.to_thread(invalidate_extraction_cache, document_hash)
+    try:
+        job = service.submit(
+            ("extract", document_hash, model),
+            lambda job: service.extract(job, document_hash, vectorstore, model)
+        )
+    except ServiceBusy:
+        raise busy_error()
+
+    if format == "ndjson" or "application/x-ndjson" in request.headers.get("accept", ""):
+        async def ndjson_lines():
+            try:
+                async for row in job.iter_rows():
+                    yield json.dumps(row, ensure_ascii=False) + "\n"
+            except Exception as e:
+                # Headers are already sent, so the failure goes in the stream
+                yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    start = time.perf_counter()
+    try:
+        result = await job.wait()
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Gagal mengekstrak data: {e}")
+    return {**result, "seconds": time.perf_counter() - start}
+
+
+@app.get("/stats")
+async def get_stats():
+    return {
+        **service.stats,
+        "queued": service.queue.qsize(),
+        "inflight": len(service.inflight),
+        "workers": service.workers,
+        "documents": len(service.vectorstores),
+    }
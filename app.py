@@ -1,28 +1,15 @@
 import streamlit as st
 import pandas as pd
 import os
-import base64
-import io
+import asyncio
+# Dependencies are checked at build time (check_dependencies.py); the LLM,
+# Chroma, PyMuPDF and OCR stacks are imported on first use by functions.py
 from functions import *
+from page_renderer import PageRenderCache
+from tracing import start_run, span
+from excel_merge import TemplateCache, frame_digest, merge_into_template
+from uploads import spool_upload
 from datetime import datetime
-import sys
-import subprocess
-import importlib.util
-import tempfile
-import fitz  # PyMuPDF
-import numpy as np
-from PIL import Image
-import pytesseract
-
-# Check and install required libraries
-required_packages = ["pymupdf", "pytesseract", "pysqlite3-binary"]
-for package in required_packages:
-    if importlib.util.find_spec(package.split("-")[0]) is None:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", package])
-
-# This is the important part that replaces the system's SQLite with pysqlite3
-__import__('pysqlite3')
-sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
 
 # Set page config FIRST - before any other Streamlit commands
 st.set_page_config(
@@ -34,6 +21,8 @@ st.set_page_config(
 
 # Get API Key
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+# Larger PDFs are offered for download only after the user asks for it
+DOWNLOAD_INLINE_MAX_MB = int(os.environ.get("DOWNLOAD_INLINE_MAX_MB", "10"))
 
 # Custom CSS for better styling
 def local_css(file_name):
@@ -43,7 +32,50 @@ def local_css(file_name):
 # Apply custom CSS
 local_css("style.css")
 
-def extract_pdf_content(uploaded_file):
+@st.cache_resource
+def get_page_cache():
+    """
+    Process-wide cache of rendered preview pages, shared by all sessions.
+    """
+    return PageRenderCache(
+        max_bytes=int(os.environ.get("PREVIEW_CACHE_MB", "64")) * 1024 * 1024,
+        fmt=os.environ.get("PREVIEW_FORMAT", "jpeg"),
+        quality=int(os.environ.get("PREVIEW_QUALITY", "80"))
+    )
+
+@st.cache_resource
+def get_template_cache():
+    """
+    Process-wide cache of parsed Excel templates, keyed by file hash.
+    """
+    return TemplateCache()
+
+def get_pdf_document(uploaded_file):
+    """
+    Open the uploaded PDF once per session and reuse the handle across reruns.
+
+    The upload is spooled to disk first and PyMuPDF reads it from there, so
+    the session holds no second copy of the file. Holding the SpooledUpload
+    keeps cleanup_spool from deleting the file while the session uses it.
+
+    :return: A (PDFDocument, SpooledUpload) tuple
+    """
+    from pdf_engine import open_pdf
+    file_id = getattr(uploaded_file, "file_id", uploaded_file.name)
+    cached = st.session_state.get("pdf_document")
+    if cached is None or cached[0] != file_id:
+        if cached is not None:
+            cached[1].close()
+        with span("upload_spool") as attrs:
+            spooled = spool_upload(uploaded_file)
+            attrs["bytes"] = spooled.size
+        st.session_state.pdf_document = (file_id, open_pdf(spooled), spooled)
+    else:
+        # Other processes sharing the spool evict by mtime
+        cached[2].touch()
+    return st.session_state.pdf_document[1:]
+
+def extract_pdf_content(uploaded_file, pdf, spooled):
     """
     Extract text and images from PDF and display them in Streamlit with pagination.
     This approach avoids browser security restrictions with embedded PDFs.
@@ -52,15 +84,8 @@ def extract_pdf_content(uploaded_file):
     if 'pdf_page_num' not in st.session_state:
         st.session_state.pdf_page_num = 0
     
-    # Save uploaded file to temp location
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-        tmp_file.write(uploaded_file.getvalue())
-        temp_path = tmp_file.name
-    
     try:
-        # Open PDF with PyMuPDF
-        doc = fitz.open(temp_path)
-        total_pages = len(doc)
+        total_pages = pdf.page_count
         
         # Add navigation functions
         def prev_page():
@@ -92,30 +117,71 @@ def extract_pdf_content(uploaded_file):
                      disabled=(st.session_state.pdf_page_num >= total_pages - 1),
                      key=f"next_btn_{uploaded_file.name}")
         
-        # Display current page
-        page = doc[st.session_state.pdf_page_num]
-            
-        # Extract images - render the whole page as an image
-        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x zoom for better quality
-        img_bytes = pix.tobytes("png")
+        # Render the whole page as an image, 2x zoom for better quality
+        page_cache = get_page_cache()
+        img_bytes = page_cache.get(pdf, st.session_state.pdf_page_num)
         
         # Display the image
         st.image(img_bytes, caption=f"Halaman {st.session_state.pdf_page_num + 1}", use_container_width=True)
+        
+        # Thumbnail strip around the current page
+        if total_pages > 1:
+            def go_to_page(page_number):
+                st.session_state.pdf_page_num = page_number
+            
+            first = max(0, min(st.session_state.pdf_page_num - 3, total_pages - 7))
+            strip_pages = range(first, min(total_pages, first + 7))
+            thumb_cols = st.columns(7)
+            for thumb_col, (page_number, thumb) in zip(thumb_cols, page_cache.thumbnails(pdf, strip_pages)):
+                with thumb_col:
+                    st.image(thumb, use_container_width=True)
+                    st.button(
+                        f"{page_number + 1}",
+                        on_click=go_to_page,
+                        args=(page_number,),
+                        disabled=(page_number == st.session_state.pdf_page_num),
+                        key=f"thumb_btn_{uploaded_file.name}_{page_number}",
+                        use_container_width=True
+                    )
             
-        # Provide a download link for the PDF
-        st.download_button(
-            "📥 Unduh PDF Asli",
-            data=uploaded_file.getvalue(),
-            file_name=uploaded_file.name,
-            mime="application/pdf",
-        )
+        # Streamlit keeps download data in memory on every rerun, so large files are only served on request
+        pdf_size = spooled.size
+        if pdf_size <= DOWNLOAD_INLINE_MAX_MB * 1024 * 1024 or st.toggle(
+            f"📥 Siapkan unduhan PDF asli ({pdf_size / 1024 / 1024:.0f} MB)", key=f"prepare_download_{uploaded_file.name}"
+        ):
+            with spooled.open() as pdf_file:
+                st.download_button(
+                    "📥 Unduh PDF Asli",
+                    data=pdf_file,
+                    file_name=uploaded_file.name,
+                    mime="application/pdf",
+                )
             
     except Exception as e:
         st.error(f"Error saat memproses PDF: {str(e)}")
-    finally:
-        # Clean up
-        if os.path.exists(temp_path):
-            os.unlink(temp_path)
+
+def remember_trace(run):
+    """
+    Keep the spans of the latest pipeline runs for the metrics panel.
+    """
+    traces = st.session_state.setdefault("traces", [])
+    traces.append(run)
+    del traces[:-10]
+
+def show_metrics_panel():
+    """
+    Show the per-stage timings of the latest runs in the sidebar.
+    """
+    with st.sidebar:
+        if not st.checkbox("📈 Tampilkan metrik", help="Tampilkan waktu setiap tahap pemrosesan"):
+            return
+        traces = st.session_state.get("traces", [])
+        if not traces:
+            st.caption("Belum ada proses yang tercatat.")
+            return
+        for run in reversed(traces):
+            st.markdown(f"**{run.name}** - {run.duration_ms or 0:.0f} ms")
+            st.dataframe(pd.DataFrame(run.to_rows()), use_container_width=True, hide_index=True)
 
 def load_streamlit_page():
     """Load the Streamlit page with improved UI layout."""
@@ -160,6 +226,13 @@ def load_streamlit_page():
                 help="Unggah file Excel template untuk data pendukung"
             )
             
+            uploaded_batch = st.file_uploader(
+                "📚 Mode Batch (beberapa PDF sekaligus)",
+                type=["pdf"],
+                accept_multiple_files=True,
+                help="Unggah beberapa surat PDF untuk diekstrak bersamaan"
+            )
+            
             # Help section
             with st.expander("ℹ️ Petunjuk Penggunaan"):
                 st.markdown("""
@@ -170,30 +243,39 @@ def load_streamlit_page():
                 5. Unduh file Excel yang sudah digabungkan
                 """)
         
-    return col1, col2, uploaded_pdf, uploaded_excel
+    return col1, col2, uploaded_pdf, uploaded_excel, uploaded_batch
 
 # Initialize Streamlit page
-col1, col2, uploaded_pdf, uploaded_excel = load_streamlit_page()
+col1, col2, uploaded_pdf, uploaded_excel, uploaded_batch = load_streamlit_page()
 
 # Process PDF
 if uploaded_pdf is not None:
+    # One PyMuPDF handle serves both the preview and the text extraction
+    pdf_document, spooled_pdf = get_pdf_document(uploaded_pdf)
+
     with col2:
         with st.container(border=True):
             st.subheader("📑 Pratinjau Dokumen", divider="green")
             
             # Display PDF content using our text+image extraction
-            extract_pdf_content(uploaded_pdf)
+            extract_pdf_content(uploaded_pdf, pdf_document, spooled_pdf)
     
-    with st.spinner("🔍 Mengekstrak teks dari PDF..."):
-        try:
-            documents = get_pdf_text(uploaded_pdf)
-            st.session_state.vector_store = create_vectorstore_from_texts(
-                documents, 
-                file_name=uploaded_pdf.name
-            )
-            st.toast("✅ PDF berhasil diproses!", icon="✅")
-        except Exception as e:
-            st.error(f"Gagal memproses PDF: {str(e)}")
+    # Reruns with the same upload reuse the collection already in the session, unless gc has deleted it since
+    ingestion_key = get_ingestion_key(pdf_document.content_hash)
+    if st.session_state.get("ingestion_key") != ingestion_key or not touch_vectorstore(st.session_state.vector_store):
+        with st.spinner("🔍 Mengekstrak teks dari PDF..."):
+            try:
+                with start_run("ingest", file=uploaded_pdf.name) as run:
+                    st.session_state.vector_store = ingest_pdf(
+                        uploaded_pdf,
+                        ingestion_key=ingestion_key,
+                        pdf=pdf_document
+                    )
+                remember_trace(run)
+                st.session_state.ingestion_key = ingestion_key
+                st.toast("✅ PDF berhasil diproses!", icon="✅")
+            except Exception as e:
+                st.error(f"Gagal memproses PDF: {str(e)}")
 
 # Generate table from PDF response
 if uploaded_pdf is not None:
@@ -204,92 +286,143 @@ if uploaded_pdf is not None:
         use_container_width=True
     )
     
+    refresh_extraction = st.checkbox(
+        "♻️ Ekstrak ulang tanpa cache",
+        help="Abaikan hasil ekstraksi tersimpan untuk dokumen ini dan panggil model lagi"
+    )
+    
+    structured_extraction = st.checkbox(
+        "🧩 Mode terstruktur",
+        help="Gunakan skema output terstruktur dan perbaiki hanya baris yang tidak valid"
+    )
+    
     if extract_button:
         with st.spinner("🧠 Menganalisis dokumen dan menghasilkan data tabel..."):
             try:
-                answer = query_document(
-                    vectorstore=st.session_state.vector_store,
-                    query="Berikan saya HARI (contoh: Senin), TANGGAL (contoh: 02 January 2025, nama bulan dalam bahasa Inggris), AGENDA (perihal kegiatan), LOKASI, REQUESTOR (lihat di yang menandatangani misal Section Head Safety, isikan Safety), LAYANAN (Sound System atau Sound System & Multimedia [contoh multimedia: proyektor, microphone, screen, dan lain-lain]), TYPE_ACARA (biarkan kosong), SITE (Bumi Patra, atau Kilang RU VI Balongan, atau Office RU VI Balongan, Pilih salah satu sesuaikan dengan lokasi), dan WORKING_HOUR (Yes atau No)."
-                )
-                st.session_state.generated_data = pd.DataFrame(answer)
+                with start_run("extract", file=uploaded_pdf.name) as run:
+                    if refresh_extraction:
+                        invalidate_extraction_cache(get_document_hash(st.session_state.vector_store))
+                    if structured_extraction:
+                        generated_df, extraction_stats = structured_query_document(
+                            vectorstore=st.session_state.vector_store,
+                            query=EXTRACTION_QUERY
+                        )
+                        st.session_state.generated_data = generated_df
+                        with st.expander("📊 Data yang Diambil dari PDF", expanded=True):
+                            st.dataframe(generated_df, use_container_width=True, hide_index=True)
+                            st.caption(
+                                f"{extraction_stats['llm_calls']} panggilan model, "
+                                f"{extraction_stats['prompt_tokens'] + extraction_stats['completion_tokens']} token, "
+                                f"{extraction_stats['retries']} perbaikan, {extraction_stats['seconds']:.1f} detik"
+                                + (" (dari cache)" if extraction_stats["cached"] else "")
+                            )
+                            if extraction_stats["invalid_rows"]:
+                                st.warning(f"{extraction_stats['invalid_rows']} baris masih perlu diperiksa.")
+                    else:
+                        with st.expander("📊 Data yang Diambil dari PDF", expanded=True):
+                            # Rows are shown as soon as the model finishes each JSON object
+                            table = st.empty()
+                            rows = []
+                            for row in stream_query_document(
+                                vectorstore=st.session_state.vector_store,
+                                query=EXTRACTION_QUERY
+                            ):
+                                rows.append(row)
+                                table.dataframe(
+                                    pd.DataFrame(rows, columns=EXPECTED_COLUMNS),
+                                    use_container_width=True,
+                                    hide_index=True
+                                )
+                            st.session_state.generated_data = pd.DataFrame(rows, columns=EXPECTED_COLUMNS)
+                            if not rows:
+                                table.dataframe(
+                                    st.session_state.generated_data,
+                                    use_container_width=True,
+                                    hide_index=True
+                                )
+                
+                remember_trace(run)
                 
-                # Display success and data
+                # Display success
                 st.toast("✅ Data berhasil diekstrak!", icon="✅")
-                with st.expander("📊 Data yang Diambil dari PDF", expanded=True):
-                    st.dataframe(
-                        st.session_state.generated_data,
-                        use_container_width=True,
-                        hide_index=True
-                    )
             except Exception as e:
                 st.error(f"Gagal mengekstrak data: {str(e)}")
 
+# Batch extraction of several PDFs
+if uploaded_batch:
+    batch_button = st.button(
+        f"📚 Extract {len(uploaded_batch)} PDF sekaligus",
+        type="primary",
+        help="Klik untuk mengekstrak informasi dari semua PDF yang diunggah",
+        use_container_width=True
+    )
+    
+    if batch_button:
+        progress_bar = st.progress(0.0, text="Memulai ekstraksi batch...")
+        
+        def update_progress(done, total, file_name, error):
+            status = "gagal" if error is not None else "selesai"
+            progress_bar.progress(done / total, text=f"{done}/{total} - {file_name} {status}")
+        
+        try:
+            with start_run("batch", files=len(uploaded_batch)) as run:
+                batch_df, batch_stats = asyncio.run(extract_batch(
+                    uploaded_batch,
+                    query=EXTRACTION_QUERY,
+                    progress_callback=update_progress
+                ))
+            remember_trace(run)
+            st.session_state.batch_data = batch_df
+            st.session_state.generated_data = batch_df.drop(columns=["SOURCE_FILE"])
+            
+            st.toast("✅ Ekstraksi batch selesai!", icon="✅")
+            for error in batch_stats["errors"]:
+                st.error(f"Gagal memproses {error['SOURCE_FILE']}: {error['ERROR']}")
+            st.caption(
+                f"{batch_stats['succeeded']}/{batch_stats['files']} surat dalam "
+                f"{batch_stats['seconds']:.1f} detik ({batch_stats['letters_per_minute']:.1f} surat/menit)"
+            )
+            with st.expander("📊 Data Batch yang Diambil dari PDF", expanded=True):
+                st.dataframe(batch_df, use_container_width=True, hide_index=True)
+        except Exception as e:
+            st.error(f"Gagal menjalankan ekstraksi batch: {str(e)}")
+
 # Process Excel file and merge data
 if uploaded_excel is not None:
     with st.spinner("📊 Memproses file Excel..."):
         try:
-            excel_df = pd.read_excel(uploaded_excel, skiprows=3)
-            excel_df.columns = ["NO", "HARI", "TANGGAL", "AGENDA", "LOKASI", 
-                               "REQUESTOR", "LAYANAN", "TYPE_ACARA", "SITE", "WORKING_HOUR"]
-            
-            # Clean and format data
-            excel_df["TANGGAL"] = pd.to_datetime(excel_df['TANGGAL'], errors='coerce').dt.strftime('%d %B %Y')
-            excel_df["NO"] = pd.to_numeric(excel_df["NO"], errors="coerce")
-            last_no = excel_df["NO"].dropna().max() or 0
+            # Parsed once per template file, later reruns hit the cache
+            template = get_template_cache().get(uploaded_excel)
             
             if "generated_data" in st.session_state:
-                generated_df = st.session_state.generated_data.copy()
-                generated_df.insert(0, "NO", range(int(last_no) + 1, int(last_no) + 1 + len(generated_df)))
-                merged_df = pd.concat([excel_df, generated_df], ignore_index=True)
-                st.session_state.merged_df = merged_df
+                merge_key = (template.content_hash, frame_digest(st.session_state.generated_data))
+                if st.session_state.get("excel_merge_key") != merge_key:
+                    with span("excel_merge", template_rows=len(template.df)) as excel_attrs:
+                        merged_df, new_rows, workbook_bytes = merge_into_template(
+                            template, st.session_state.generated_data
+                        )
+                        excel_attrs["new_rows"] = len(new_rows)
+                    st.session_state.merged_df = merged_df
+                    st.session_state.excel_output = workbook_bytes
+                    st.session_state.excel_new_rows = len(new_rows)
+                    st.session_state.excel_merge_key = merge_key
+                    st.toast("✅ Data berhasil digabungkan!", icon="✅")
                 
-                # Display merged data
-                st.toast("✅ Data berhasil digabungkan!", icon="✅")
+                merged_df = st.session_state.merged_df
+                skipped = len(st.session_state.generated_data) - st.session_state.excel_new_rows
                 with st.expander("🧩 Data yang Sudah Digabung", expanded=True):
+                    if skipped:
+                        st.caption(f"{skipped} baris sudah ada di template dan tidak ditambahkan lagi.")
                     st.dataframe(
                         merged_df,
                         use_container_width=True,
                         hide_index=True
                     )
                 
-                # Prepare Excel download
-                output = io.BytesIO()
-                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                    merged_df.to_excel(writer, sheet_name="Sheet1", startrow=3, index=False)
-                    workbook = writer.book
-                    worksheet = writer.sheets["Sheet1"]
-                    
-                    # Format columns
-                    column_widths = {
-                        "NO": 5, "HARI": 10, "TANGGAL": 15, "AGENDA": 30, 
-                        "LOKASI": 25, "REQUESTOR": 20, "LAYANAN": 20, 
-                        "TYPE_ACARA": 20, "SITE": 15, "WORKING_HOUR": 15
-                    }
-                    
-                    for col_num, (col_name, width) in enumerate(column_widths.items()):
-                        worksheet.set_column(col_num, col_num, width)
-                    
-                    # Add title and formatting
-                    title_format = workbook.add_format({
-                        'bold': True, 
-                        'align': 'center', 
-                        'valign': 'vcenter', 
-                        'font_size': 14,
-                        'font_name': 'Arial'
-                    })
-                    
-                    worksheet.merge_range(
-                        1, 0, 1, len(merged_df.columns) - 1, 
-                        "SUPPORT LAYANAN SOUND SYSTEM & MULTIMEDIA SSC ICT RU VI BALONGAN", 
-                        title_format
-                    )
-                
-                output.seek(0)
-                
                 # Download button with improved styling
                 st.download_button(
                     label="📥 Unduh Excel yang Digabung",
-                    data=output,
+                    data=st.session_state.excel_output,
                     file_name=f"Support_Sound_Multimedia_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                     type="primary",
@@ -300,6 +433,8 @@ if uploaded_excel is not None:
         except Exception as e:
             st.error(f"Gagal memproses file Excel: {str(e)}")
 
+# Timings of this and earlier runs, drawn last so the current run is included
+show_metrics_panel()
 
 # Footer
 st.markdown("---")
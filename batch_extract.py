@@ -0,0 +1,77 @@
+"""
+Extract schedule rows from a folder or list of PDF letters.
+
+    python batch_extract.py surat/ --output hasil.xlsx --concurrency 4
+    python batch_extract.py a.pdf b.pdf --output hasil.csv
+"""
+import os
+import sys
+import glob
+import asyncio
+import argparse
+
+from functions import extract_batch, EXTRACTION_QUERY
+from uploads import SpooledUpload, hash_file
+
+
+class LocalFile(SpooledUpload):
+    """
+    A PDF on disk, opened in place instead of being read into memory.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            content_hash = hash_file(f)
+        super().__init__(path, os.path.basename(path), content_hash, os.path.getsize(path))
+
+
+def collect_pdfs(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.pdf"))))
+        else:
+            files.append(path)
+    return files
+
+
+def print_progress(done, total, file_name, error):
+    status = f"GAGAL: {error}" if error is not None else "OK"
+    print(f"[{done}/{total}] {file_name} - {status}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ekstraksi batch surat PDF")
+    parser.add_argument("paths", nargs="+", help="File PDF atau folder berisi PDF")
+    parser.add_argument("--output", "-o", default="hasil_batch.xlsx", help="File hasil (.xlsx atau .csv)")
+    parser.add_argument("--concurrency", "-c", type=int, default=4)
+    parser.add_argument("--query", default=EXTRACTION_QUERY)
+    args = parser.parse_args()
+
+    pdf_paths = collect_pdfs(args.paths)
+    if not pdf_paths:
+        print("Tidak ada file PDF yang ditemukan.")
+        return 1
+
+    files = [LocalFile(path) for path in pdf_paths]
+    df, stats = asyncio.run(extract_batch(
+        files,
+        query=args.query,
+        max_concurrency=args.concurrency,
+        progress_callback=print_progress
+    ))
+
+    if args.output.endswith(".csv"):
+        df.to_csv(args.output, index=False)
+    else:
+        df.to_excel(args.output, index=False)
+
+    for error in stats["errors"]:
+        print(f"GAGAL {error['SOURCE_FILE']}: {error['ERROR']}")
+    print(f"{stats['succeeded']}/{stats['files']} surat berhasil dalam {stats['seconds']:.1f} detik "
+          f"({stats['letters_per_minute']:.1f} surat/menit), hasil disimpan ke {args.output}")
+    return 0 if stats["failed"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
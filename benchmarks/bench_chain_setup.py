@@ -0,0 +1,79 @@
+"""
+Measure per-call setup overhead of query_document before and after the chain registry.
+
+"before" rebuilds ChatOpenAI, the retriever, the prompt and the LCEL chain on
+every call like the original query_document; "after" uses get_rag_chain.
+
+    python benchmarks/bench_chain_setup.py --calls 50
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai import start_server
+
+server, base_url, state = start_server()
+os.environ["OPENAI_BASE_URL"] = base_url
+os.environ["OPENAI_API_KEY"] = "fake"
+# Keep the benchmark's Chroma and caches out of the working tree
+os.chdir(tempfile.mkdtemp(prefix="bench_chain_"))
+
+from langchain_core.documents import Document
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnablePassthrough
+from langchain_openai import ChatOpenAI
+
+import functions
+
+
+def build_chain_per_call(vectorstore):
+    llm = ChatOpenAI(model=functions.CHAT_MODEL, api_key="fake", base_url=base_url)
+    retriever = vectorstore.as_retriever(search_type="similarity")
+    prompt_template = ChatPromptTemplate.from_template(functions.PROMPT_TEMPLATE)
+    return (
+        {"context": retriever | functions.format_docs, "question": RunnablePassthrough()}
+        | prompt_template
+        | llm
+    )
+
+
+def measure(label, get_chain, vectorstore, calls):
+    setup_times = []
+    call_times = []
+    connections_before = state.counters.get("connections", 0)
+    for _ in range(calls):
+        start = time.perf_counter()
+        chain = get_chain(vectorstore)
+        built = time.perf_counter()
+        chain.invoke("Berikan saya HARI dan TANGGAL")
+        setup_times.append(built - start)
+        call_times.append(time.perf_counter() - built)
+    connections = state.counters.get("connections", 0) - connections_before
+    print(f"{label:<7} setup mean={statistics.mean(setup_times) * 1000:7.2f}ms "
+          f"call p50={statistics.median(call_times) * 1000:7.2f}ms "
+          f"new connections={connections}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+
+    chunks = [
+        Document(page_content=f"Undangan rapat koordinasi hari ke-{i} di Gedung Bumi Patra.", metadata={"page": i})
+        for i in range(20)
+    ]
+    vectorstore = functions.create_vectorstore(
+        chunks, functions.get_embedding_function(), functions.hash_bytes(b"bench_chain"), "bench_chain"
+    )
+    try:
+        measure("before", build_chain_per_call, vectorstore, args.calls)
+        measure("after", functions.get_rag_chain, vectorstore, args.calls)
+    finally:
+        server.shutdown()
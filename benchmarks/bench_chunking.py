@@ -0,0 +1,86 @@
+"""
+Offline comparison of the chunking strategies on the synthetic letter corpus.
+
+For every strategy it reports chunks per letter, chunks that need embedding,
+context tokens sent to the LLM and field recall: the share of the golden
+fields (date, time, place, agenda, requestor) present in the context the
+LLM would see. Retrieval uses a lexical hashing embedding and the
+retriever's default k=4, so no API is needed.
+
+    python benchmarks/bench_chunking.py --letters 24
+"""
+import os
+import sys
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from chunking import chunk_documents, count_tokens, fits_whole
+from pdf_engine import PDFDocument
+from functions import EXTRACTION_QUERY, PROMPT_TEMPLATE, format_docs
+from fake_openai import lexical_embedding
+from letters import make_corpus, date_range_text
+
+STRATEGIES = ["recursive", "tokens", "layout", "whole", "auto"]
+TOP_K = 4
+DIMENSIONS = 512
+
+
+def golden_facts(spec):
+    return [
+        date_range_text(spec),
+        f"{spec['start_hour']:02d}.00",
+        spec["location"],
+        spec["agenda"],
+        f"Section Head {spec['requestor']}",
+    ]
+
+
+def retrieve(chunks, query, k=TOP_K):
+    matrix = np.stack([lexical_embedding(chunk.page_content, DIMENSIONS) for chunk in chunks])
+    scores = matrix @ lexical_embedding(query, DIMENSIONS)
+    return [chunks[i] for i in np.argsort(-scores)[:k]]
+
+
+def normalize(text):
+    return " ".join(text.split())
+
+
+def evaluate(letter, strategy):
+    with PDFDocument(letter["data"], name=letter["name"]) as pdf:
+        documents = pdf.load()
+        if strategy == "auto":
+            strategy = "whole" if fits_whole(documents) else "layout"
+        chunks = chunk_documents(documents, strategy, pdf=pdf)
+
+    context_docs = chunks if strategy == "whole" else retrieve(chunks, EXTRACTION_QUERY)
+    context = normalize(format_docs(context_docs))
+    prompt = PROMPT_TEMPLATE.format(context=format_docs(context_docs), question=EXTRACTION_QUERY)
+    facts = golden_facts(letter["spec"])
+    return {
+        "chunks": len(chunks),
+        "embedded": 0 if strategy == "whole" else len(chunks),
+        "tokens": count_tokens(prompt),
+        "recall": sum(normalize(fact) in context for fact in facts) / len(facts),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--letters", type=int, default=24)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.letters, seed=args.seed)
+    print(f"{'strategy':<10} {'chunks/letter':>14} {'embedded':>9} {'tokens sent':>12} {'field recall':>13}")
+    for strategy in STRATEGIES:
+        results = [evaluate(letter, strategy) for letter in corpus]
+        print(f"{strategy:<10} "
+              f"{statistics.mean(r['chunks'] for r in results):>14.1f} "
+              f"{sum(r['embedded'] for r in results):>9d} "
+              f"{statistics.mean(r['tokens'] for r in results):>12.0f} "
+              f"{statistics.mean(r['recall'] for r in results):>13.1%}")
@@ -0,0 +1,63 @@
+"""
+Compare sequential and concurrent ingestion against the fake OpenAI server.
+
+    python benchmarks/bench_embedding_pipeline.py --chunks 400 --latency 0.3 --rate-limit-rate 0.1
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chromadb
+from langchain_core.documents import Document
+from langchain_openai import OpenAIEmbeddings
+
+from embedding_pipeline import embed_into_collection
+from fake_openai import start_server
+
+
+def make_chunks(count):
+    return [
+        Document(
+            page_content=f"Halaman {i // 4 + 1}. Rapat koordinasi ke-{i} di Gedung Bumi Patra. " * 20,
+            metadata={"page": i // 4}
+        )
+        for i in range(count)
+    ]
+
+
+def run(label, chunks, embeddings, max_workers):
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection(f"bench_{max_workers}_{int(time.time() * 1000)}")
+    ids = [str(i) for i in range(len(chunks))]
+    start = time.perf_counter()
+    stats = embed_into_collection(collection, chunks, ids, embeddings, max_workers=max_workers)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} workers={max_workers:<3} batches={stats['batches']:<4} "
+          f"429s={stats['rate_limited']:<4} stored={collection.count():<5} {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    server, base_url, state = start_server(latency=args.latency, rate_limit_rate=args.rate_limit_rate)
+    embeddings = OpenAIEmbeddings(
+        model="text-embedding-3-small",
+        openai_api_key="fake",
+        openai_api_base=base_url,
+        max_retries=0
+    )
+    chunks = make_chunks(args.chunks)
+    try:
+        run("sequential", chunks, embeddings, max_workers=1)
+        run("concurrent", chunks, embeddings, max_workers=args.workers)
+    finally:
+        server.shutdown()
+    print("server counters:", state.counters)
@@ -0,0 +1,122 @@
+"""
+Measure the Excel template merge on a large template.
+
+"before" is the original app.py path: pd.read_excel through openpyxl, concat
+and a full re-render with pd.ExcelWriter on every rerun. "after" uses
+excel_merge: a cold parse (calamine when installed), a cached parse as on
+later reruns, the hashed dedup and the constant_memory writer.
+
+    python benchmarks/bench_excel_merge.py --rows 50000 --new 20
+"""
+import io
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from excel_merge import (
+    TEMPLATE_COLUMNS, TEMPLATE_HEADER_ROW, TITLE, TemplateCache, default_engine, merge_into_template
+)
+from letters import AGENDAS, LOCATIONS, REQUESTORS, SERVICES, DAY_NAMES
+
+
+def make_rows(count, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for index in range(count):
+        day = date(2020, 1, 1) + timedelta(days=rng.randint(0, 2000))
+        location, site = rng.choice(LOCATIONS)
+        rows.append({
+            "HARI": DAY_NAMES[day.weekday()],
+            "TANGGAL": day.strftime("%d %B %Y"),
+            "AGENDA": f"{rng.choice(AGENDAS)} {index}",
+            "LOKASI": location,
+            "REQUESTOR": rng.choice(REQUESTORS),
+            "LAYANAN": rng.choice(SERVICES)[0],
+            "TYPE_ACARA": "",
+            "SITE": site,
+            "WORKING_HOUR": rng.choice(["Yes", "No"]),
+        })
+    return rows
+
+
+def make_template(count):
+    df = pd.DataFrame(make_rows(count))
+    df.insert(0, "NO", range(1, count + 1))
+    df["TANGGAL"] = pd.to_datetime(df["TANGGAL"], format="%d %B %Y")
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+        df.to_excel(writer, sheet_name="Sheet1", startrow=TEMPLATE_HEADER_ROW, index=False)
+        writer.sheets["Sheet1"].write(1, 0, TITLE)
+    return output.getvalue(), df
+
+
+def merge_before(data, generated_df):
+    # The original app.py code
+    excel_df = pd.read_excel(io.BytesIO(data), skiprows=3)
+    excel_df.columns = TEMPLATE_COLUMNS
+    excel_df["TANGGAL"] = pd.to_datetime(excel_df['TANGGAL'], errors='coerce').dt.strftime('%d %B %Y')
+    excel_df["NO"] = pd.to_numeric(excel_df["NO"], errors="coerce")
+    last_no = excel_df["NO"].dropna().max() or 0
+    generated_df = generated_df.copy()
+    generated_df.insert(0, "NO", range(int(last_no) + 1, int(last_no) + 1 + len(generated_df)))
+    merged_df = pd.concat([excel_df, generated_df], ignore_index=True)
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        merged_df.to_excel(writer, sheet_name="Sheet1", startrow=3, index=False)
+        workbook = writer.book
+        worksheet = writer.sheets["Sheet1"]
+        worksheet.merge_range(1, 0, 1, len(merged_df.columns) - 1, TITLE, workbook.add_format({'bold': True}))
+    return merged_df, output.getvalue()
+
+
+def measure(label, fn):
+    # tracemalloc slows allocation-heavy code several times over, so the time comes from
+    # a separate pass without it; fn must therefore give the same work on both calls
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed * 1000:9.1f}ms  peak Python memory {peak / 1024 / 1024:7.1f} MB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--new", type=int, default=20, help="Generated rows, half of them already in the template")
+    args = parser.parse_args()
+
+    data, template_df = make_template(args.rows)
+    print(f"template: {args.rows} rows, {len(data) / 1024 / 1024:.1f} MB, read engine {default_engine()}")
+    existing = template_df.head(args.new // 2).drop(columns=["NO"])
+    existing["TANGGAL"] = existing["TANGGAL"].dt.strftime("%d %B %Y")
+    generated = pd.concat(
+        [existing, pd.DataFrame(make_rows(args.new - len(existing), seed=1))], ignore_index=True
+    )
+
+    merged_before, _ = measure("before (every rerun)", lambda: merge_before(data, generated))
+
+    # A fresh cache per call keeps both passes of the cold parse cold
+    measure("after: parse (cold)", lambda: TemplateCache().get(data))
+    cache = TemplateCache()
+    template = cache.get(data)
+    measure("after: parse (cached)", lambda: cache.get(data))
+    merged_after, new_rows, _ = measure("after: dedup + write", lambda: merge_into_template(template, generated))
+    print(f"rows before={len(merged_before)} after={len(merged_after)} "
+          f"(skipped {len(generated) - len(new_rows)} duplicates)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Compare the old two-parser path (temp files + PyMuPDF preview + PyPDFLoader text)
+with the single in-memory PyMuPDF pass of pdf_engine.
+
+Each method runs in its own subprocess so peak RSS is measured independently.
+
+    python benchmarks/bench_pdf_loading.py                 # synthetic 40-page letter
+    python benchmarks/bench_pdf_loading.py surat.pdf --repeat 5
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_synthetic_pdf(path, pages):
+    import fitz
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        text = "\n".join(
+            f"Nomor: {number:03d}/SSC/2025 - Rapat koordinasi hari ke-{number + 1}, baris {line}"
+            for line in range(45)
+        )
+        page.insert_text((50, 60), text, fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def two_parser_path(data):
+    import fitz
+    from langchain_community.document_loaders import PyPDFLoader
+
+    # Preview: temp file + PyMuPDF render of the first page
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+        tmp_file.write(data)
+        preview_path = tmp_file.name
+    try:
+        doc = fitz.open(preview_path)
+        doc[0].get_pixmap(matrix=fitz.Matrix(2, 2)).tobytes("png")
+        doc.close()
+    finally:
+        os.unlink(preview_path)
+
+    # Text: second temp file + pypdf
+    temp_file = tempfile.NamedTemporaryFile(delete=False)
+    temp_file.write(data)
+    temp_file.close()
+    try:
+        return len(PyPDFLoader(temp_file.name).load())
+    finally:
+        os.unlink(temp_file.name)
+
+
+def single_pass_path(data):
+    from pdf_engine import PDFDocument
+
+    with PDFDocument(data, name="bench.pdf") as pdf:
+        pdf.render_page(0, zoom=2)
+        return len(pdf.load())
+
+
+METHODS = {"two_parser": two_parser_path, "single_pass": single_pass_path}
+
+
+def run_child(method, path, repeat):
+    with open(path, "rb") as f:
+        data = f.read()
+    # Import cost is not part of the per-page figure
+    METHODS[method](data)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = METHODS[method](data)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(json.dumps({
+        "method": method,
+        "pages": pages,
+        "best_seconds": best,
+        "ms_per_page": best * 1000 / pages,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdf", nargs="?")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", choices=sorted(METHODS))
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.pdf, args.repeat)
+        sys.exit(0)
+
+    path = args.pdf
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), f"bench_letter_{args.pages}p.pdf")
+        make_synthetic_pdf(path, args.pages)
+
+    print(f"{'method':<12} {'pages':>5} {'ms/page':>9} {'total s':>8} {'peak RSS MB':>12}")
+    for method in METHODS:
+        output = subprocess.run(
+            [sys.executable, __file__, path, "--child", method, "--repeat", str(args.repeat)],
+            check=True, capture_output=True, text=True, cwd=ROOT
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{method:<12} {result['pages']:>5} {result['ms_per_page']:>9.2f} "
+              f"{result['best_seconds']:>8.3f} {result['peak_rss_mb']:>12.1f}")
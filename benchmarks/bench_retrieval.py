@@ -0,0 +1,96 @@
+"""
+Compare top-k query latency of Chroma and the in-memory NumPy index.
+
+For each collection size random unit vectors are stored in a persistent
+Chroma collection and in a NumpyVectorIndex, then the same queries are run
+against both (embedding the query is left out, it costs the same either
+way). The index is rebuilt from the collection on every ingestion and a
+letter gets about one query, so "repaid after" (load time divided by the
+per-query saving) must stay near 1 for sizes below NUMPY_INDEX_MAX_CHUNKS.
+
+    python benchmarks/bench_retrieval.py --sizes 10,32,100,1000,100000 --queries 50
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from langchain_core.documents import Document
+
+from sqlite_compat import use_modern_sqlite
+from numpy_index import NumpyVectorIndex
+
+use_modern_sqlite()
+import chromadb
+
+# Chroma rejects larger add() batches
+CHROMA_ADD_BATCH = 5000
+
+
+def timed(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, sorted(times)[int(0.95 * (len(times) - 1))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10,32,100,1000,100000")
+    parser.add_argument("--dims", type=int, default=1536, help="text-embedding-3-small has 1536 dimensions")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    client = chromadb.PersistentClient(path=tempfile.mkdtemp(prefix="bench_retrieval_"))
+    queries = rng.standard_normal((args.queries, args.dims)).astype(np.float32)
+
+    print(f"{'chunks':>8} {'chroma p50':>11} {'p95':>8} {'numpy p50':>10} {'p95':>8} {'mmr p50':>8} "
+          f"{'load ms':>8} {'speedup':>8} {'repaid after':>13}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        vectors = rng.standard_normal((size, args.dims)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        ids = [f"chunk-{i}" for i in range(size)]
+        texts = [f"Potongan surat nomor {i}" for i in range(size)]
+
+        # Chroma's default L2 space, as in the collections ingest_pdf writes; on unit vectors it
+        # ranks like the index's cosine scores
+        collection = client.create_collection(f"bench_{size}")
+        for start in range(0, size, CHROMA_ADD_BATCH):
+            end = start + CHROMA_ADD_BATCH
+            collection.add(ids=ids[start:end], embeddings=vectors[start:end].tolist(), documents=texts[start:end])
+
+        query_iter = iter(np.tile(queries, (2, 1)))
+        chroma_p50, chroma_p95 = timed(
+            lambda: collection.query(query_embeddings=[next(query_iter).tolist()], n_results=args.k),
+            args.queries
+        )
+
+        # Loading the index the way NumpyVectorStore.from_collection does
+        load_start = time.perf_counter()
+        stored = collection.get(include=["documents", "embeddings"])
+        index = NumpyVectorIndex([Document(page_content=text) for text in stored["documents"]], stored["embeddings"])
+        load_ms = (time.perf_counter() - load_start) * 1000
+
+        query_iter = iter(np.tile(queries, (2, 1)))
+        numpy_p50, numpy_p95 = timed(lambda: index.similarity_search(next(query_iter), k=args.k), args.queries)
+        query_iter = iter(np.tile(queries, (2, 1)))
+        mmr_p50, _ = timed(lambda: index.max_marginal_relevance_search(next(query_iter), k=args.k), args.queries)
+
+        saving = chroma_p50 - numpy_p50
+        repaid = f"{load_ms / saving:.1f} queries" if saving > 0 else "never"
+        print(f"{size:>8} {chroma_p50:>9.2f}ms {chroma_p95:>6.2f}ms {numpy_p50:>8.2f}ms {numpy_p95:>6.2f}ms "
+              f"{mmr_p50:>6.2f}ms {load_ms:>8.1f} {chroma_p50 / numpy_p50:>7.1f}x {repaid:>13}")
+        client.delete_collection(f"bench_{size}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measure the cold import cost of the app's modules with python -X importtime.
+
+"lazy" imports functions the way app.py now does; "eager" additionally
+imports what app.py and functions.py used to load up front (LangChain's
+OpenAI and Chroma integrations, chromadb, PyMuPDF, pytesseract, numpy and
+PIL). Each variant runs in a fresh interpreter several times and the
+median is reported, along with the slowest top-level imports.
+
+    python benchmarks/bench_startup.py --runs 5 --top 10
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VARIANTS = {
+    "lazy": "import functions, page_renderer, tracing",
+    "eager": (
+        "import functions, page_renderer, tracing\n"
+        "import langchain_openai, langchain.vectorstores, chromadb\n"
+        "import fitz, pytesseract, numpy, PIL.Image, pdf_engine, embedding_pipeline"
+    ),
+}
+
+
+def import_times(code):
+    """
+    Run code in a fresh interpreter and parse its -X importtime report.
+
+    :return: A (total seconds, {top-level module: cumulative seconds}) tuple
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two spaces per level below the first
+        if len(name) - len(name.lstrip()) == 1:
+            name = name.strip()
+            modules[name] = modules.get(name, 0) + int(cumulative) / 1e6
+    return sum(modules.values()), modules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    medians = {}
+    for label, code in VARIANTS.items():
+        totals = []
+        modules = {}
+        for _ in range(args.runs):
+            total, modules = import_times(code)
+            totals.append(total)
+        medians[label] = statistics.median(totals)
+        print(f"{label:<6} import median={medians[label] * 1000:8.1f}ms  "
+              f"min={min(totals) * 1000:8.1f}ms  max={max(totals) * 1000:8.1f}ms")
+        for name, seconds in sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f"    {name:<32} {seconds * 1000:8.1f}ms")
+    print(f"cold start saved {(medians['eager'] - medians['lazy']) * 1000:.1f}ms "
+          f"({1 - medians['lazy'] / medians['eager']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Compare time-to-first-row of stream_query_document with the full-completion query_document.
+
+The fake server streams a multi-day answer in small chunks with a delay
+between chunks, roughly like a real completion.
+
+    python benchmarks/bench_streaming.py --days 5 --chunk-delay 0.02
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai import start_server, DEFAULT_ROW
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--days", type=int, default=5)
+parser.add_argument("--chunk-delay", type=float, default=0.02)
+args = parser.parse_args()
+
+rows = [dict(DEFAULT_ROW, TANGGAL=f"{6 + day:02d} January 2025") for day in range(args.days)]
+server, base_url, state = start_server(
+    chat_responder=lambda messages: "```json\n" + json.dumps(rows, indent=2) + "\n```",
+    stream_chunk_delay=args.chunk_delay
+)
+os.environ["OPENAI_BASE_URL"] = base_url
+os.environ["OPENAI_API_KEY"] = "fake"
+os.chdir(tempfile.mkdtemp(prefix="bench_stream_"))
+
+from langchain_core.documents import Document
+
+import functions
+
+if __name__ == "__main__":
+    chunks = [Document(page_content="Undangan rapat koordinasi lima hari.", metadata={"page": 0})]
+    vectorstore = functions.create_vectorstore(
+        chunks, functions.get_embedding_function(), functions.hash_bytes(b"bench_stream"), "bench_stream"
+    )
+    try:
+        start = time.perf_counter()
+        df = functions.query_document(vectorstore, functions.EXTRACTION_QUERY)
+        full = time.perf_counter() - start
+        print(f"query_document         rows={len(df)} all rows after {full:.2f}s")
+
+        start = time.perf_counter()
+        first = None
+        count = 0
+        for row in functions.stream_query_document(vectorstore, functions.EXTRACTION_QUERY):
+            count += 1
+            if first is None:
+                first = time.perf_counter() - start
+        total = time.perf_counter() - start
+        print(f"stream_query_document  rows={count} first row after {first:.2f}s, last after {total:.2f}s")
+    finally:
+        server.shutdown()
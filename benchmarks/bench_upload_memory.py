@@ -0,0 +1,136 @@
+"""
+Measure the memory each session costs for a large uploaded PDF.
+
+Every session holds its upload in a BytesIO, as Streamlit's UploadedFile
+does, then opens it, extracts the text and renders the first page.
+"before" is the original path: getvalue() copies for PyMuPDF, for the
+content hash and for the download button. "after" spools the upload to
+disk once and lets PyMuPDF read it from there (uploads.py); the download
+is only prepared on request for files above DOWNLOAD_INLINE_MAX_MB.
+
+Each variant runs in its own process so ru_maxrss is that variant's peak.
+
+    python benchmarks/bench_upload_memory.py --mb 40 --sessions 4
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+VARIANTS = ["before", "after"]
+
+
+def current_rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_large_pdf(path, target_mb):
+    """
+    Write an image-only letter repeated until the file reaches target_mb.
+    """
+    import fitz
+    from letters import make_specs, build_letter_pdf, scan_pdf
+
+    scanned = fitz.open(stream=scan_pdf(build_letter_pdf(make_specs(1)[0]), zoom=3.0), filetype="pdf")
+    page_bytes = len(scanned.tobytes()) / scanned.page_count
+    doc = fitz.open()
+    for _ in range(max(1, int(target_mb * 1024 * 1024 / page_bytes / scanned.page_count))):
+        doc.insert_pdf(scanned)
+    doc.save(path)
+    return os.path.getsize(path)
+
+
+class UploadedBytes(io.BytesIO):
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def run_session(variant, upload, spool_dir):
+    import hashlib
+    from pdf_engine import PDFDocument, open_pdf
+    from uploads import spool_upload
+
+    if variant == "before":
+        pdf = PDFDocument(upload.getvalue(), name=upload.name)
+        content_hash = hashlib.sha256(upload.getvalue()).hexdigest()
+        # st.download_button keeps its own copy of the data
+        kept = [upload.getvalue()]
+    else:
+        spooled = spool_upload(upload, directory=spool_dir)
+        pdf = open_pdf(spooled)
+        content_hash = pdf.content_hash
+        kept = []
+    pdf.load()
+    pdf.render_page(0, zoom=1.0, fmt="jpeg")
+    return pdf, content_hash, kept
+
+
+def worker(variant, pdf_path, sessions):
+    import pdf_engine  # noqa: F401  imported before the baseline so only per-session memory is counted
+    import uploads  # noqa: F401
+
+    spool_dir = tempfile.mkdtemp(prefix="bench_spool_")
+    with open(pdf_path, "rb") as f:
+        data = f.read()
+    baseline = current_rss_mb()
+    start = time.perf_counter()
+    held = []
+    for index in range(sessions):
+        # Each session gets its own upload buffer, as Streamlit keeps one per session
+        upload = UploadedBytes(bytes(bytearray(data)), f"session_{index}.pdf")
+        held.append((upload, run_session(variant, upload, spool_dir)))
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "variant": variant,
+        "baseline_mb": baseline,
+        "peak_mb": peak_rss_mb(),
+        "end_mb": current_rss_mb(),
+        "seconds": elapsed,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=float, default=40, help="Approximate size of the test PDF")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--worker", choices=VARIANTS)
+    parser.add_argument("--pdf")
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.pdf, args.sessions)
+        return
+
+    pdf_path = os.path.join(tempfile.mkdtemp(prefix="bench_upload_"), "large.pdf")
+    size_mb = make_large_pdf(pdf_path, args.mb) / 1024 / 1024
+    print(f"{size_mb:.1f} MB PDF, {args.sessions} concurrent sessions")
+    print(f"{'variant':>8} {'peak MB':>9} {'end MB':>8} {'per session MB':>15} {'seconds':>8}")
+    for variant in VARIANTS:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", variant, "--pdf", pdf_path,
+             "--sessions", str(args.sessions)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        per_session = (result["peak_mb"] - result["baseline_mb"]) / args.sessions
+        print(f"{variant:>8} {result['peak_mb']:>9.1f} {result['end_mb']:>8.1f} {per_session:>15.1f} "
+              f"{result['seconds']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
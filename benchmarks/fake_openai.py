@@ -0,0 +1,309 @@
+"""
+Local stand-in for the OpenAI API used by the benchmarks.
+
+Serves deterministic /embeddings and /chat/completions responses with
+configurable latency and an optional share of HTTP 429 responses.
+Embeddings are hashed bag-of-words vectors by default, so retrieval over
+them behaves like a (crude) lexical search. Point
+the app at it with
+
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake
+
+Run standalone with `python benchmarks/fake_openai.py --latency 0.2`.
+"""
+import re
+import json
+import time
+import base64
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import tiktoken
+
+
+DEFAULT_ROW = {
+    "HARI": "Senin",
+    "TANGGAL": "06 January 2025",
+    "AGENDA": "Rapat Koordinasi",
+    "LOKASI": "Gedung Bumi Patra",
+    "REQUESTOR": "Safety",
+    "LAYANAN": "Sound System",
+    "TYPE_ACARA": "",
+    "SITE": "Bumi Patra",
+    "WORKING_HOUR": "Yes",
+}
+
+
+def default_chat_responder(messages):
+    return json.dumps([DEFAULT_ROW], indent=2)
+
+
+class FakeOpenAIState:
+    def __init__(self, latency=0.0, rate_limit_rate=0.0, dimensions=1536, seed=0, chat_responder=None,
+                 stream_chunk_size=16, stream_chunk_delay=0.0, embedding_mode="lexical"):
+        self.latency = latency
+        self.embedding_mode = embedding_mode
+        self.encoding = tiktoken.get_encoding("cl100k_base")
+        self.stream_chunk_size = stream_chunk_size
+        self.stream_chunk_delay = stream_chunk_delay
+        self.chat_responder = chat_responder or default_chat_responder
+        self.rate_limit_rate = rate_limit_rate
+        self.dimensions = dimensions
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {}
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def should_rate_limit(self):
+        with self.lock:
+            return self.random.random() < self.rate_limit_rate
+
+
+def fake_embedding(item, dimensions):
+    """
+    Return a deterministic unit vector for a string or a list of token ids.
+    """
+    digest = hashlib.sha256(json.dumps(item).encode("utf-8")).digest()
+    rng = np.random.default_rng(int.from_bytes(digest[:8], "little"))
+    vector = rng.standard_normal(dimensions).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def lexical_embedding(text, dimensions):
+    """
+    Return a hashed bag-of-words unit vector, so similar texts get similar vectors.
+    """
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for word in re.findall(r"\w+", text.lower()):
+        digest = hashlib.md5(word.encode("utf-8")).digest()
+        vector[int.from_bytes(digest[:4], "little") % dimensions] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def setup(self):
+        super().setup()
+        self.state.count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            with self.state.lock:
+                self._send_json(200, dict(self.state.counters))
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        path = self.path.rstrip("/")
+        payload = self._read_json()
+        self.state.count("requests")
+
+        if self.state.latency:
+            time.sleep(self.state.latency)
+
+        if self.state.should_rate_limit():
+            self.state.count("rate_limited")
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                headers={"Retry-After": "0.1"}
+            )
+            return
+
+        if path.endswith("/embeddings"):
+            self._handle_embeddings(payload)
+        elif path.endswith("/chat/completions"):
+            self._handle_chat(payload)
+        else:
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+    def _handle_embeddings(self, payload):
+        inputs = payload.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        dimensions = payload.get("dimensions") or self.state.dimensions
+        as_base64 = payload.get("encoding_format") == "base64"
+
+        data = []
+        tokens = 0
+        for index, item in enumerate(inputs):
+            if self.state.embedding_mode == "lexical":
+                # OpenAIEmbeddings sends token ids, decode them back to text
+                text = self.state.encoding.decode(item) if isinstance(item, list) else item
+                vector = lexical_embedding(text, dimensions)
+            else:
+                vector = fake_embedding(item, dimensions)
+            tokens += len(item) if isinstance(item, list) else max(1, len(item) // 4)
+            embedding = base64.b64encode(vector.tobytes()).decode("ascii") if as_base64 else vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+
+        self.state.count("embedding_requests")
+        self.state.count("embedding_inputs", len(inputs))
+        self.state.count("embedding_tokens", tokens)
+        self._send_json(200, {
+            "object": "list",
+            "data": data,
+            "model": payload.get("model", "fake-embedding"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    def _handle_chat(self, payload):
+        messages = payload.get("messages", [])
+        content = self.state.chat_responder(messages)
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in messages) // 4
+        completion_tokens = len(content) // 4
+
+        self.state.count("chat_requests")
+        self.state.count("chat_prompt_tokens", prompt_tokens)
+        self.state.count("chat_completion_tokens", completion_tokens)
+        if payload.get("stream"):
+            self._stream_chat(payload, content)
+            return
+        message = {"role": "assistant", "content": content}
+        finish_reason = "stop"
+        if payload.get("tools"):
+            message = self._tool_call_message(payload["tools"][0]["function"], content)
+            finish_reason = "tool_calls"
+        self._send_json(200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake-chat"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": finish_reason,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+
+    def _tool_call_message(self, function, content):
+        # Answer function calling / structured output requests with the responder's JSON
+        try:
+            parsed = json.loads(content.replace("```json", "").replace("```", "").strip())
+        except json.JSONDecodeError:
+            parsed = {}
+        properties = function.get("parameters", {}).get("properties", {})
+        if isinstance(parsed, list):
+            if "rows" in properties:
+                parsed = {"rows": parsed}
+            else:
+                parsed = parsed[0] if parsed else {}
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{
+                "id": "call_fake",
+                "type": "function",
+                "function": {"name": function["name"], "arguments": json.dumps(parsed)},
+            }],
+        }
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream_chat(self, payload, content):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        size = self.state.stream_chunk_size
+        pieces = [content[i:i + size] for i in range(0, len(content), size)]
+        deltas = [{"role": "assistant", "content": ""}] + [{"content": piece} for piece in pieces]
+        for index, delta in enumerate(deltas):
+            if index and self.state.stream_chunk_delay:
+                time.sleep(self.state.stream_chunk_delay)
+            event = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": payload.get("model", "fake-chat"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+            }
+            self._write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+
+        final = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake-chat"),
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }
+        self._write_chunk(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+
+def start_server(host="127.0.0.1", port=0, **state_kwargs):
+    """
+    Start the fake server on a background thread.
+
+    :return: A (server, base_url, state) tuple; call server.shutdown() when done
+    """
+    state = FakeOpenAIState(**state_kwargs)
+    handler = type("BoundFakeOpenAIHandler", (FakeOpenAIHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_address[1]}/v1"
+    return server, base_url, state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--embedding-mode", choices=["lexical", "random"], default="lexical")
+    parser.add_argument("--stream-chunk-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    args = parser.parse_args()
+
+    server, base_url, _ = start_server(
+        args.host, args.port,
+        latency=args.latency,
+        rate_limit_rate=args.rate_limit_rate,
+        dimensions=args.dimensions,
+        embedding_mode=args.embedding_mode,
+        stream_chunk_delay=args.stream_chunk_delay
+    )
+    print(f"Fake OpenAI server listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
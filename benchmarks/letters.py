@@ -0,0 +1,301 @@
+"""
+Synthetic official letters with golden rows, used as benchmark fixtures.
+
+Letters follow the layout of the real ones: letterhead, number and subject,
+a body of 0-14 filler paragraphs (pushing the schedule table to page 2 or
+3), the schedule table and a signature block. scan_pdf turns a letter into
+an image-only PDF to exercise the OCR path.
+"""
+import re
+import json
+import random
+import textwrap
+from datetime import date, timedelta
+
+import fitz  # PyMuPDF
+
+DAY_NAMES = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu", "Minggu"]
+MONTH_NAMES = [
+    "Januari", "Februari", "Maret", "April", "Mei", "Juni",
+    "Juli", "Agustus", "September", "Oktober", "November", "Desember"
+]
+AGENDAS = [
+    "Rapat Koordinasi K3 Triwulan", "Sosialisasi Tata Kelola Energi", "Town Hall Meeting Manajemen",
+    "Pelatihan Fire Fighting Dasar", "Workshop Digitalisasi Kilang", "Halal Bihalal Pekerja",
+    "Management Walkthrough Turnaround", "Sosialisasi Program CSR", "Rapat Evaluasi Kinerja Unit",
+]
+LOCATIONS = [
+    ("Gedung Bumi Patra", "Bumi Patra"),
+    ("Ruang Rapat Kilang Lantai 2", "Kilang RU VI Balongan"),
+    ("Auditorium Office RU VI", "Office RU VI Balongan"),
+]
+REQUESTORS = ["Safety", "HR", "Maintenance Planning", "Procurement", "General Affairs", "Engineering"]
+SERVICES = [
+    ("Sound System", "sound system dan 2 (dua) unit microphone wireless"),
+    ("Sound System & Multimedia", "sound system, proyektor, screen dan microphone"),
+]
+FILLER = (
+    "Sehubungan dengan program kerja fungsi kami tahun berjalan, bersama ini kami sampaikan bahwa "
+    "kegiatan tersebut merupakan bagian dari upaya peningkatan kinerja dan budaya kerja yang aman, "
+    "andal dan efisien di lingkungan Refinery Unit VI Balongan. Seluruh peserta diharapkan hadir tepat "
+    "waktu dan mematuhi ketentuan HSSE yang berlaku selama kegiatan berlangsung."
+)
+
+
+def format_date_id(day):
+    return f"{day.day:02d} {MONTH_NAMES[day.month - 1]} {day.year}"
+
+
+def make_specs(count, seed=0):
+    """
+    Return count random letter specifications.
+    """
+    rng = random.Random(seed)
+    specs = []
+    for index in range(count):
+        location, site = rng.choice(LOCATIONS)
+        service, service_detail = rng.choice(SERVICES)
+        start_hour = rng.choice([8, 9, 13, 16, 19])
+        specs.append({
+            "name": f"surat_{index:03d}.pdf",
+            "number": f"{rng.randint(100, 999)}/KPI/RU-VI/{rng.randint(2024, 2025)}",
+            "agenda": rng.choice(AGENDAS),
+            "location": location,
+            "site": site,
+            "requestor": rng.choice(REQUESTORS),
+            "service": service,
+            "service_detail": service_detail,
+            "start": date(2025, 1, 1) + timedelta(days=rng.randint(0, 330)),
+            "days": rng.choice([1, 1, 2, 3, 5]),
+            "start_hour": start_hour,
+            "filler_paragraphs": rng.choice([0, 2, 6, 14]),
+        })
+    return specs
+
+
+def event_days(spec):
+    return [spec["start"] + timedelta(days=offset) for offset in range(spec["days"])]
+
+
+def golden_rows(spec):
+    """
+    Return the rows a perfect extraction of the letter would produce, one per day.
+    """
+    working_hour = "Yes" if 7 <= spec["start_hour"] < 16 else "No"
+    return [
+        {
+            "HARI": DAY_NAMES[day.weekday()],
+            "TANGGAL": day.strftime("%d %B %Y"),
+            "AGENDA": spec["agenda"],
+            "LOKASI": spec["location"],
+            "REQUESTOR": spec["requestor"],
+            "LAYANAN": spec["service"],
+            "TYPE_ACARA": "",
+            "SITE": spec["site"],
+            "WORKING_HOUR": working_hour,
+        }
+        for day in event_days(spec)
+    ]
+
+
+def date_range_text(spec):
+    days = event_days(spec)
+    first, last = days[0], days[-1]
+    if first == last:
+        return f"{DAY_NAMES[first.weekday()]}, {format_date_id(first)}"
+    return (f"{DAY_NAMES[first.weekday()]} s.d. {DAY_NAMES[last.weekday()]}, "
+            f"{format_date_id(first)} s.d. {format_date_id(last)}")
+
+
+class _Writer:
+    def __init__(self, doc):
+        self.doc = doc
+        self.page = doc.new_page()
+        self.y = 60
+
+    def ensure(self, height):
+        if self.y + height > 780:
+            self.page = self.doc.new_page()
+            self.y = 60
+
+    def line(self, text, fontsize=10, x=60, bold=False):
+        self.ensure(fontsize + 4)
+        self.page.insert_text((x, self.y), text, fontsize=fontsize, fontname="hebo" if bold else "helv")
+        self.y += fontsize + 4
+
+    def paragraph(self, text, width=95):
+        for line in textwrap.wrap(text, width):
+            self.line(line)
+        self.y += 6
+
+    def table(self, rows, widths=(130, 345), height=20):
+        self.ensure(height * len(rows) + 10)
+        for label, value in rows:
+            x = 60
+            for text, width in zip((label, value), widths):
+                rect = fitz.Rect(x, self.y, x + width, self.y + height)
+                self.page.draw_rect(rect, color=(0, 0, 0), width=0.7)
+                self.page.insert_text((x + 4, self.y + 14), text, fontsize=9)
+                x += width
+            self.y += height
+        self.y += 12
+
+
+def build_letter_pdf(spec):
+    """
+    Render a letter specification to PDF bytes with a text layer.
+    """
+    doc = fitz.open()
+    writer = _Writer(doc)
+    writer.line("PT KILANG PERTAMINA INTERNASIONAL", fontsize=13, bold=True)
+    writer.line("Refinery Unit VI Balongan", fontsize=11)
+    writer.y += 10
+    writer.line(f"Nomor   : {spec['number']}")
+    writer.line(f"Perihal : Permohonan Dukungan {spec['service']} - {spec['agenda']}")
+    writer.y += 8
+    writer.line("Kepada Yth.")
+    writer.line("Section Head SSC ICT")
+    writer.line("di Tempat")
+    writer.y += 8
+    writer.paragraph(
+        f"Dengan hormat, bersama ini kami mengajukan permohonan dukungan {spec['service_detail']} "
+        f"untuk kegiatan {spec['agenda']} yang akan dilaksanakan pada:"
+    )
+    for _ in range(spec["filler_paragraphs"]):
+        writer.paragraph(FILLER)
+    end_hour = min(spec["start_hour"] + 4, 23)
+    writer.table([
+        ("Hari/Tanggal", date_range_text(spec)),
+        ("Waktu", f"{spec['start_hour']:02d}.00 - {end_hour:02d}.00 WIB"),
+        ("Tempat", spec["location"]),
+        ("Kebutuhan", spec["service_detail"]),
+    ])
+    writer.paragraph("Demikian kami sampaikan, atas perhatian dan kerja samanya kami ucapkan terima kasih.")
+    writer.ensure(90)
+    writer.line(f"Balongan, {format_date_id(spec['start'] - timedelta(days=7))}")
+    writer.line(f"Section Head {spec['requestor']}")
+    writer.y += 36
+    writer.line("Budi Santoso", bold=True)
+
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def scan_pdf(data, zoom=2.0):
+    """
+    Return an image-only copy of a PDF, like a scanned letter without a text layer.
+    """
+    source = fitz.open(stream=data, filetype="pdf")
+    scanned = fitz.open()
+    for page in source:
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        new_page = scanned.new_page(width=page.rect.width, height=page.rect.height)
+        new_page.insert_image(new_page.rect, stream=pix.tobytes("png"))
+    result = scanned.tobytes()
+    source.close()
+    scanned.close()
+    return result
+
+
+def make_corpus(count=12, seed=0, scanned_every=0):
+    """
+    Build a corpus of synthetic letters.
+
+    :param count: Number of letters
+    :param seed: Random seed of the specifications
+    :param scanned_every: Make every n-th letter image-only (0 for none)
+
+    :return: A list of dicts with name, data, spec, rows and scanned
+    """
+    corpus = []
+    for index, spec in enumerate(make_specs(count, seed)):
+        data = build_letter_pdf(spec)
+        scanned = bool(scanned_every) and index % scanned_every == scanned_every - 1
+        if scanned:
+            data = scan_pdf(data)
+        corpus.append({
+            "name": spec["name"],
+            "data": data,
+            "spec": spec,
+            "rows": golden_rows(spec),
+            "scanned": scanned,
+        })
+    return corpus
+
+
+MONTH_PATTERN = "|".join(MONTH_NAMES)
+DATE_PATTERN = re.compile(rf"(\d{{1,2}})\s+({MONTH_PATTERN})\s+(\d{{4}})")
+
+
+def _parse_date_id(match):
+    day, month, year = match.groups()
+    return date(int(year), MONTH_NAMES.index(month) + 1, int(day))
+
+
+def _after_label(text, label):
+    # Table cells come out either as "Label | value" (layout blocks) or on the next line. The label
+    # must start a line, so "di Tempat" in the salutation is not taken for the table's "Tempat"
+    match = re.search(rf"^[ \t]*{re.escape(label)}[ \t]*(?:\|\s*|:\s*|\n\s*)([^\n|]+)", text, re.MULTILINE)
+    return " ".join(match.group(1).split()) if match else ""
+
+
+def rows_from_context(context, compact=True):
+    """
+    Extract rows from letter text the way a careful model would.
+
+    Used by the fake chat server, so extraction accuracy depends only on
+    whether retrieval put the right parts of the letter in the context.
+    With compact, a multi-day event is one row with TANGGAL_SELESAI, as the
+    current prompts ask; otherwise there is one row per day.
+    """
+    schedule = _after_label(context, "Hari/Tanggal")
+    dates = [_parse_date_id(match) for match in DATE_PATTERN.finditer(schedule)]
+    if not dates:
+        return []
+    days = [dates[0] + timedelta(days=offset) for offset in range((dates[-1] - dates[0]).days + 1)]
+
+    subject = re.search(r"Permohonan Dukungan (Sound System(?: & Multimedia)?) - ([^\n]+)", context)
+    service, agenda = (subject.group(1), " ".join(subject.group(2).split())) if subject else ("", "")
+    location = _after_label(context, "Tempat")
+    requestors = [
+        " ".join(name.split()) for name in re.findall(r"Section Head ([A-Za-z][A-Za-z ]*)", context)
+        if not name.startswith("SSC")
+    ]
+    time_match = re.search(r"(\d{2})\.00\s*-", _after_label(context, "Waktu"))
+    working_hour = ""
+    if time_match:
+        working_hour = "Yes" if 7 <= int(time_match.group(1)) < 16 else "No"
+    site = next((site for name, site in LOCATIONS if name == location), "")
+    details = {
+        "AGENDA": agenda,
+        "LOKASI": location,
+        "REQUESTOR": requestors[0] if requestors else "",
+        "LAYANAN": service,
+        "TYPE_ACARA": "",
+        "SITE": site,
+        "WORKING_HOUR": working_hour,
+    }
+
+    if compact:
+        return [{
+            "TANGGAL": days[0].strftime("%d %B %Y"),
+            "TANGGAL_SELESAI": days[-1].strftime("%d %B %Y") if len(days) > 1 else "",
+            **details,
+        }]
+    return [
+        {"HARI": DAY_NAMES[day.weekday()], "TANGGAL": day.strftime("%d %B %Y"), **details}
+        for day in days
+    ]
+
+
+def extraction_responder(messages):
+    """
+    Chat responder for the fake server that answers PROMPT_TEMPLATE prompts from their context.
+
+    Prompts that still ask for one row per day get one, so older prompts can be compared.
+    """
+    prompt = "\n".join(str(message.get("content", "")) for message in messages)
+    context = prompt.split("Konteks:", 1)[-1].split("\n---\n", 1)[0]
+    rows = rows_from_context(context, compact="TANGGAL_SELESAI" in prompt)
+    return "```json\n" + json.dumps(rows, indent=2) + "\n```"
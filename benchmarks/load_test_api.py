@@ -0,0 +1,117 @@
+"""
+Load-test the FastAPI service (api.py) against the fake OpenAI server.
+
+Starts the fake server and uvicorn in this process, then runs --clients
+concurrent clients that each upload a letter from a small corpus and
+extract it, so many requests hit the same document and exercise the
+in-flight deduplication. Reports status codes, latency percentiles,
+throughput and how many chat calls actually reached the model.
+
+    python benchmarks/load_test_api.py --clients 64 --letters 8 --latency 0.3
+    API_WORKERS=2 API_QUEUE_SIZE=4 python benchmarks/load_test_api.py --clients 64
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai import start_server
+from letters import make_corpus, extraction_responder
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--clients", type=int, default=32)
+parser.add_argument("--letters", type=int, default=8)
+parser.add_argument("--latency", type=float, default=0.2, help="Fake server latency per request in seconds")
+parser.add_argument("--ndjson", action="store_true", help="Request NDJSON streaming instead of JSON")
+parser.add_argument("--port", type=int, default=8765)
+args = parser.parse_args()
+
+fake_server, base_url, state = start_server(latency=args.latency, chat_responder=extraction_responder)
+os.environ["OPENAI_BASE_URL"] = base_url
+os.environ["OPENAI_API_KEY"] = "fake"
+os.chdir(tempfile.mkdtemp(prefix="bench_api_"))
+
+import httpx
+import uvicorn
+
+import api
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))]
+
+
+async def client(http, letter, statuses, latencies):
+    start = time.perf_counter()
+    response = await http.post(
+        "/documents", params={"filename": letter["name"]}, content=letter["data"],
+        headers={"Content-Type": "application/pdf"}
+    )
+    statuses[f"upload {response.status_code}"] += 1
+    if response.status_code != 200:
+        return
+    document_hash = response.json()["document_hash"]
+    if args.ndjson:
+        async with http.stream("POST", f"/documents/{document_hash}/extract", params={"format": "ndjson"}) as stream:
+            async for _ in stream.aiter_lines():
+                pass
+            status = stream.status_code
+    else:
+        status = (await http.post(f"/documents/{document_hash}/extract")).status_code
+    statuses[f"extract {status}"] += 1
+    if status == 200:
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_clients():
+    corpus = make_corpus(args.letters)
+    rng = random.Random(0)
+    statuses = Counter()
+    latencies = []
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=300) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            client(http, rng.choice(corpus), statuses, latencies) for _ in range(args.clients)
+        ))
+        elapsed = time.perf_counter() - start
+        stats = (await http.get("/stats")).json()
+    return statuses, latencies, elapsed, stats
+
+
+def main():
+    server = uvicorn.Server(uvicorn.Config(api.app, port=args.port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    try:
+        statuses, latencies, elapsed, stats = asyncio.run(run_clients())
+    finally:
+        server.should_exit = True
+        thread.join()
+        fake_server.shutdown()
+
+    print(f"{args.clients} clients, {args.letters} distinct letters, workers={api.API_WORKERS} "
+          f"queue={api.API_QUEUE_SIZE}, {'ndjson' if args.ndjson else 'json'}")
+    print("status  " + "  ".join(f"{key}={value}" for key, value in sorted(statuses.items())))
+    print(f"latency p50={percentile(latencies, 0.5) * 1000:.0f}ms p95={percentile(latencies, 0.95) * 1000:.0f}ms  "
+          f"throughput={len(latencies) / elapsed:.1f} extractions/s")
+    print("service " + "  ".join(f"{key}={value}" for key, value in stats.items()))
+    print(f"model   chat_requests={state.counters.get('chat_requests', 0)} "
+          f"embedding_requests={state.counters.get('embedding_requests', 0)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+End-to-end extraction benchmark and regression harness.
+
+Runs the synthetic letter corpus (text-layer and scanned) through
+ingest_pdf -> query_document against the fake OpenAI server, the path
+an upload takes in the app. It reports per-stage wall time with
+p50/p95, API calls, tokens sent, peak RSS and field-level accuracy
+against the golden rows. Results are written as JSON so runs can be
+compared across commits.
+
+    python benchmarks/run_benchmarks.py --letters 24 --latency 0.2 --output results.json
+    python benchmarks/run_benchmarks.py --output new.json --compare results.json
+"""
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai import start_server
+from letters import make_corpus, extraction_responder
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--letters", type=int, default=24)
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument("--scanned-every", type=int, default=4, help="Make every n-th letter image-only (0 for none)")
+parser.add_argument("--latency", type=float, default=0.0, help="Fake server latency per request in seconds")
+parser.add_argument("--strategy", default="auto", help="Chunking strategy, see chunking.CHUNKING_STRATEGIES")
+parser.add_argument("--structured", action="store_true", help="Extract with structured_query_document")
+parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+parser.add_argument("--compare", help="Print the differences with an earlier results file")
+args = parser.parse_args()
+
+server, base_url, state = start_server(latency=args.latency, chat_responder=extraction_responder)
+os.environ["OPENAI_BASE_URL"] = base_url
+os.environ["OPENAI_API_KEY"] = "fake"
+# Cold caches and an empty Chroma store for every run
+os.chdir(tempfile.mkdtemp(prefix="bench_e2e_"))
+
+import functions
+from pdf_engine import PDFDocument
+from tracing import start_run
+
+STAGES = ["parse", "index", "query", "total"]
+# Spans of ingest_pdf counted as "parse"; the rest of the ingestion is "index"
+PARSE_SPANS = {"pdf_parse", "ocr"}
+FIELDS = functions.EXPECTED_COLUMNS
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def score(predicted, golden):
+    """
+    Count matching fields, pairing predicted and golden rows by TANGGAL.
+    """
+    by_date = {}
+    for row in predicted:
+        by_date.setdefault(str(row.get("TANGGAL") or "").strip(), row)
+    matches = {field: 0 for field in FIELDS}
+    for gold in golden:
+        row = by_date.get(gold["TANGGAL"], {})
+        for field in FIELDS:
+            if str(row.get(field) or "").strip() == gold[field]:
+                matches[field] += 1
+    return matches
+
+
+def run_letter(letter):
+    timings = {}
+    start = time.perf_counter()
+    with PDFDocument(letter["data"], name=letter["name"]) as pdf, start_run("ingest") as run:
+        # The strategy choice, the collection registry and the NumPy index all happen in here
+        vectorstore = functions.ingest_pdf(pdf, pdf=pdf, strategy=args.strategy)
+    ingest_seconds = time.perf_counter() - start
+    timings["parse"] = sum(row["ms"] for row in run.to_rows() if row["stage"] in PARSE_SPANS) / 1000
+    timings["index"] = ingest_seconds - timings["parse"]
+
+    stage = time.perf_counter()
+    if args.structured:
+        df, _ = functions.structured_query_document(vectorstore, functions.EXTRACTION_QUERY, use_cache=False)
+    else:
+        df = functions.query_document(vectorstore, functions.EXTRACTION_QUERY, use_cache=False)
+    timings["query"] = time.perf_counter() - stage
+    timings["total"] = time.perf_counter() - start
+    return timings, functions.dataframe_to_rows(df)
+
+
+def main():
+    corpus = make_corpus(args.letters, seed=args.seed, scanned_every=args.scanned_every)
+    stage_times = {stage: [] for stage in STAGES}
+    matches = {field: 0 for field in FIELDS}
+    golden_total = 0
+    exact_letters = 0
+    errors = []
+
+    for letter in corpus:
+        try:
+            timings, rows = run_letter(letter)
+        except Exception as e:
+            errors.append({"letter": letter["name"], "scanned": letter["scanned"], "error": str(e)})
+            print(f"{letter['name']}: GAGAL {e}", file=sys.stderr)
+            continue
+        for stage in STAGES:
+            stage_times[stage].append(timings[stage])
+        letter_matches = score(rows, letter["rows"])
+        for field in FIELDS:
+            matches[field] += letter_matches[field]
+        golden_total += len(letter["rows"])
+        if len(rows) == len(letter["rows"]) and all(
+            count == len(letter["rows"]) for count in letter_matches.values()
+        ):
+            exact_letters += 1
+
+    with state.lock:
+        counters = dict(state.counters)
+    server.shutdown()
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+
+    processed = len(corpus) - len(errors)
+    results = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "letters": len(corpus),
+        "scanned_letters": sum(letter["scanned"] for letter in corpus),
+        "errors": errors,
+        "stages": {
+            stage: {
+                "sum_s": sum(values),
+                "p50_s": percentile(values, 0.5),
+                "p95_s": percentile(values, 0.95),
+                "mean_s": statistics.mean(values) if values else 0.0,
+            }
+            for stage, values in stage_times.items()
+        },
+        "api": {
+            "embedding_requests": counters.get("embedding_requests", 0),
+            "embedding_tokens": counters.get("embedding_tokens", 0),
+            "chat_requests": counters.get("chat_requests", 0),
+            "chat_prompt_tokens": counters.get("chat_prompt_tokens", 0),
+            "chat_completion_tokens": counters.get("chat_completion_tokens", 0),
+            "rate_limited": counters.get("rate_limited", 0),
+        },
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "accuracy": {
+            "fields": {field: matches[field] / golden_total if golden_total else 0.0 for field in FIELDS},
+            "overall": sum(matches.values()) / (golden_total * len(FIELDS)) if golden_total else 0.0,
+            "exact_letters": exact_letters / processed if processed else 0.0,
+        },
+    }
+
+    print(f"commit {commit}  letters={results['letters']} scanned={results['scanned_letters']} "
+          f"errors={len(errors)} peak RSS={results['peak_rss_mb']:.0f} MB")
+    print(f"{'stage':<8} {'p50 ms':>9} {'p95 ms':>9} {'total s':>9}")
+    for stage, values in results["stages"].items():
+        print(f"{stage:<8} {values['p50_s'] * 1000:>9.1f} {values['p95_s'] * 1000:>9.1f} {values['sum_s']:>9.2f}")
+    print("api     " + "  ".join(f"{key}={value}" for key, value in results["api"].items()))
+    print("accuracy " + "  ".join(f"{field}={value:.0%}" for field, value in results["accuracy"]["fields"].items()))
+    print(f"overall {results['accuracy']['overall']:.1%}  exact letters {results['accuracy']['exact_letters']:.1%}")
+
+    if args.output:
+        with open(os.path.join(ROOT, args.output) if not os.path.isabs(args.output) else args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        path = args.compare if os.path.isabs(args.compare) else os.path.join(ROOT, args.compare)
+        with open(path) as f:
+            baseline = json.load(f)
+        print(f"\ncompared with {baseline.get('commit', '?')}:")
+        for stage in STAGES:
+            old = baseline["stages"][stage]["p50_s"]
+            new = results["stages"][stage]["p50_s"]
+            change = (new - old) / old if old else 0.0
+            print(f"  {stage:<8} p50 {old * 1000:8.1f} -> {new * 1000:8.1f} ms ({change:+.0%})")
+        for key in results["api"]:
+            print(f"  {key:<24} {baseline['api'].get(key, 0):>8} -> {results['api'][key]:>8}")
+        print(f"  accuracy {baseline['accuracy']['overall']:.1%} -> {results['accuracy']['overall']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
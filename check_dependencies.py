@@ -0,0 +1,82 @@
+"""
+Check once, at build time, that everything the app needs is installed.
+
+The app no longer installs packages while starting; run this after
+`pip install -r requirements.txt` (the devcontainer does) and fix whatever
+it reports instead.
+
+    python check_dependencies.py
+"""
+import sys
+import shutil
+import sqlite3
+import subprocess
+import importlib.util
+
+from ocr import OCR_LANG
+from sqlite_compat import CHROMA_MIN_SQLITE
+
+# Import name -> pip package
+REQUIRED_MODULES = {
+    "streamlit": "streamlit",
+    "pandas": "pandas",
+    "numpy": "numpy",
+    "httpx": "httpx",
+    "dotenv": "python-dotenv",
+    "pydantic": "pydantic",
+    "tiktoken": "tiktoken",
+    "langchain": "langchain",
+    "langchain_core": "langchain-core",
+    "langchain_community": "langchain-community",
+    "langchain_openai": "langchain-openai",
+    "chromadb": "chromadb",
+    "fitz": "pymupdf",
+    "PIL": "pillow",
+    "pytesseract": "pytesseract",
+    "openpyxl": "openpyxl",
+    "xlsxwriter": "xlsxwriter",
+}
+
+
+def missing_modules():
+    return [package for module, package in REQUIRED_MODULES.items() if importlib.util.find_spec(module) is None]
+
+
+def check_sqlite():
+    if sqlite3.sqlite_version_info >= CHROMA_MIN_SQLITE:
+        return None
+    if importlib.util.find_spec("pysqlite3") is not None:
+        return None
+    return f"SQLite {sqlite3.sqlite_version} terlalu lama untuk Chroma dan pysqlite3-binary tidak terpasang"
+
+
+def check_tesseract(langs):
+    if shutil.which("tesseract") is None:
+        return "tesseract tidak ditemukan, pasang paket di packages.txt"
+    output = subprocess.run(["tesseract", "--list-langs"], capture_output=True, text=True).stdout
+    available = set(output.split()[1:])
+    missing = [lang for lang in langs.split("+") if lang not in available]
+    if missing:
+        return f"data bahasa tesseract tidak ada: {', '.join(missing)}"
+    return None
+
+
+def main():
+    problems = []
+    packages = missing_modules()
+    if packages:
+        problems.append(f"paket Python belum terpasang: {' '.join(packages)}")
+    for problem in (check_sqlite(), check_tesseract(OCR_LANG)):
+        if problem:
+            problems.append(problem)
+
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}", file=sys.stderr)
+        return 1
+    print("✅ Semua dependensi tersedia")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
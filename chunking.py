@@ -0,0 +1,168 @@
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+CHUNKING_STRATEGIES = ("auto", "whole", "recursive", "tokens", "layout")
+ENCODING_NAME = "cl100k_base"
+TOKEN_CHUNK_SIZE = 400
+TOKEN_CHUNK_OVERLAP = 50
+LAYOUT_CHUNK_TOKENS = 500
+# Letters up to this size are sent whole instead of being embedded and retrieved
+WHOLE_DOCUMENT_MAX_TOKENS = 6000
+
+_encoding = None
+
+
+def count_tokens(text):
+    """
+    Return the number of tokens of a text in the chat model's encoding.
+    """
+    global _encoding
+    if _encoding is None:
+        import tiktoken
+        _encoding = tiktoken.get_encoding(ENCODING_NAME)
+    return len(_encoding.encode_ordinary(text))
+
+
+def fits_whole(documents, max_tokens=WHOLE_DOCUMENT_MAX_TOKENS):
+    """
+    Return True if the documents together fit in max_tokens.
+    """
+    total = 0
+    for doc in documents:
+        total += count_tokens(doc.page_content)
+        if total > max_tokens:
+            return False
+    return True
+
+
+def split_recursive(documents, chunk_size, chunk_overlap):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=["\n\n", "\n", " "]
+    )
+    return text_splitter.split_documents(documents)
+
+
+def split_by_tokens(documents, chunk_size=TOKEN_CHUNK_SIZE, chunk_overlap=TOKEN_CHUNK_OVERLAP):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        encoding_name=ENCODING_NAME,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", " "]
+    )
+    return text_splitter.split_documents(documents)
+
+
+def split_layout(blocks, max_tokens=LAYOUT_CHUNK_TOKENS):
+    """
+    Pack consecutive layout blocks into chunks without ever splitting a block.
+
+    A block larger than max_tokens becomes a chunk of its own, so tables and
+    signature blocks always stay whole.
+
+    :param blocks: Block documents from PDFDocument.load_blocks, in reading order
+    :param max_tokens: Token budget of a chunk
+
+    :return: A list of Document objects
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    def flush():
+        if current:
+            chunks.append(Document(
+                page_content="\n\n".join(block.page_content for block in current),
+                metadata={
+                    "source": current[0].metadata.get("source", ""),
+                    "page": current[0].metadata.get("page", 0),
+                    "last_page": current[-1].metadata.get("page", 0),
+                }
+            ))
+
+    for block in blocks:
+        tokens = count_tokens(block.page_content)
+        if current and current_tokens + tokens > max_tokens:
+            flush()
+            current = []
+            current_tokens = 0
+        current.append(block)
+        current_tokens += tokens
+    flush()
+    return chunks
+
+
+def layout_blocks(pdf, documents):
+    """
+    Return the layout blocks of a PDF, using the page documents for pages without blocks.
+
+    Scanned pages have no text blocks, so their (OCR) page text is used as a single block.
+    """
+    blocks = pdf.load_blocks()
+    pages_with_blocks = {block.metadata["page"] for block in blocks}
+    for doc in documents:
+        if doc.metadata.get("page") not in pages_with_blocks and doc.page_content.strip():
+            blocks.append(Document(
+                page_content=doc.page_content,
+                metadata={"source": doc.metadata.get("source", ""), "page": doc.metadata.get("page", 0), "kind": "page"}
+            ))
+    blocks.sort(key=lambda block: block.metadata["page"])
+    return blocks
+
+
+def chunk_documents(documents, strategy="recursive", chunk_size=1500, chunk_overlap=200, pdf=None):
+    """
+    Split page documents with one of the chunking strategies.
+
+    :param documents: Per-page Document objects
+    :param strategy: "recursive" (characters), "tokens" (tiktoken), "layout" (PyMuPDF
+        blocks, needs pdf) or "whole" (one chunk per document set)
+    :param chunk_size: Character chunk size of the recursive strategy
+    :param chunk_overlap: Character chunk overlap of the recursive strategy
+    :param pdf: The PDFDocument the documents come from, required by "layout"
+
+    :return: A list of Document objects
+    """
+    if strategy == "recursive":
+        return split_recursive(documents, chunk_size, chunk_overlap)
+    if strategy == "tokens":
+        return split_by_tokens(documents)
+    if strategy == "layout":
+        if pdf is None:
+            return split_by_tokens(documents)
+        return split_layout(layout_blocks(pdf, documents))
+    if strategy == "whole":
+        return [Document(
+            page_content="\n\n".join(doc.page_content for doc in documents),
+            metadata={"source": documents[0].metadata.get("source", "") if documents else "", "page": 0}
+        )]
+    raise ValueError(f"Unknown chunking strategy: {strategy}")
+
+
+class WholeDocumentRetriever(BaseRetriever):
+    """
+    Retriever that always returns every document, for letters sent to the LLM whole.
+    """
+    documents: list
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return self.documents
+
+
+class WholeDocumentStore:
+    """
+    Stand-in for a vector store when the whole letter fits in the prompt.
+
+    Nothing is embedded or persisted; as_retriever hands every page to the chain.
+    """
+
+    def __init__(self, documents, document_hash=None):
+        self.documents = documents
+        self.document_hash = document_hash
+
+    def as_retriever(self, **kwargs):
+        return WholeDocumentRetriever(documents=self.documents)
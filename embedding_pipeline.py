@@ -0,0 +1,232 @@
+import time
+import random
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
+import tiktoken
+
+EMBED_BATCH_TOKENS = 4000
+EMBED_BATCH_SIZE = 128
+EMBED_MAX_WORKERS = 4
+EMBED_MAX_RETRIES = 6
+EMBED_BASE_DELAY = 1.0
+EMBED_MAX_DELAY = 30.0
+
+
+def batch_by_tokens(texts, max_tokens=EMBED_BATCH_TOKENS, max_items=EMBED_BATCH_SIZE, encoding_name="cl100k_base"):
+    """
+    Pack texts into batches that stay under a token budget.
+
+    A text that is larger than the budget on its own gets a batch of its own.
+
+    :param texts: A list of strings
+    :param max_tokens: Maximum number of tokens per batch
+    :param max_items: Maximum number of texts per batch
+    :param encoding_name: The tiktoken encoding used to count tokens
+
+    :return: A list of batches, each a list of indices into texts
+    """
+    encoding = tiktoken.get_encoding(encoding_name)
+    token_counts = [len(tokens) for tokens in encoding.encode_ordinary_batch(list(texts))]
+
+    batches = []
+    current = []
+    current_tokens = 0
+    for index, count in enumerate(token_counts):
+        if current and (current_tokens + count > max_tokens or len(current) >= max_items):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(index)
+        current_tokens += count
+    if current:
+        batches.append(current)
+    return batches
+
+
+def is_rate_limit_error(error):
+    """
+    Return True if an exception raised by an API client is an HTTP 429.
+    """
+    if getattr(error, "status_code", None) == 429:
+        return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+def is_transient_error(error):
+    """
+    Return True for errors worth retrying that are not rate limits: timeouts, conflicts, 5xx and dropped connections.
+    """
+    status_code = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status_code is not None:
+        return status_code in (408, 409) or status_code >= 500
+    import openai
+    return isinstance(error, openai.APIConnectionError)
+
+
+def get_retry_after(error):
+    """
+    Return the Retry-After delay of a rate limit error in seconds, if the server sent one.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limiter that halves its limit on rate limits and grows it back on success.
+    """
+
+    def __init__(self, max_limit):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.active = 0
+        self.rate_limited = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.active >= self.limit:
+                self._cond.wait()
+            self.active += 1
+
+    def release(self, success=True):
+        with self._cond:
+            self.active -= 1
+            if success and self.limit < self.max_limit:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+    def backoff(self):
+        with self._cond:
+            self.rate_limited += 1
+            self.limit = max(1, self.limit // 2)
+            self._successes = 0
+
+
+def embed_with_retry(embedding_function, texts, limiter, max_retries=EMBED_MAX_RETRIES, base_delay=EMBED_BASE_DELAY,
+                     cancelled=None):
+    """
+    Embed one batch, backing off and shrinking concurrency whenever the API returns 429.
+
+    The OpenAI client must be built with max_retries=0: this is the only
+    retry loop, so the limiter sees every 429. Transient errors are retried
+    with the same backoff but leave the concurrency limit alone.
+
+    :param embedding_function: A LangChain Embeddings object
+    :param texts: The texts of the batch
+    :param limiter: The AdaptiveConcurrency shared by all batches
+    :param max_retries: Number of retries after a rate limit or transient error before giving up
+    :param base_delay: Initial backoff delay in seconds
+    :param cancelled: An optional threading.Event; once set, no further attempt is made
+
+    :return: A list of vectors aligned with texts
+    """
+    for attempt in range(max_retries + 1):
+        if cancelled is not None and cancelled.is_set():
+            raise CancelledError()
+        limiter.acquire()
+        try:
+            vectors = embedding_function.embed_documents(texts)
+        except Exception as e:
+            limiter.release(success=False)
+            rate_limited = is_rate_limit_error(e)
+            if not (rate_limited or is_transient_error(e)) or attempt == max_retries:
+                raise
+            if rate_limited:
+                limiter.backoff()
+            delay = get_retry_after(e)
+            if delay is None:
+                delay = min(EMBED_MAX_DELAY, base_delay * 2 ** attempt)
+            delay *= random.uniform(1.0, 1.5)
+            if cancelled is not None:
+                # Wakes up as soon as the ingestion is abandoned instead of sleeping out the backoff
+                cancelled.wait(delay)
+            else:
+                time.sleep(delay)
+            continue
+        limiter.release(success=True)
+        return vectors
+
+
+def _upsert(collection, ids, embeddings, documents, metadatas):
+    # Chroma rejects empty metadata dicts, so rows without metadata go in separately
+    with_metadata = [i for i, metadata in enumerate(metadatas) if metadata]
+    without_metadata = [i for i, metadata in enumerate(metadatas) if not metadata]
+    if with_metadata:
+        collection.upsert(
+            ids=[ids[i] for i in with_metadata],
+            embeddings=[embeddings[i] for i in with_metadata],
+            documents=[documents[i] for i in with_metadata],
+            metadatas=[metadatas[i] for i in with_metadata]
+        )
+    if without_metadata:
+        collection.upsert(
+            ids=[ids[i] for i in without_metadata],
+            embeddings=[embeddings[i] for i in without_metadata],
+            documents=[documents[i] for i in without_metadata]
+        )
+
+
+def embed_into_collection(collection, chunks, ids, embedding_function, max_workers=EMBED_MAX_WORKERS,
+                          max_tokens=EMBED_BATCH_TOKENS, max_items=EMBED_BATCH_SIZE):
+    """
+    Embed chunks in token-budgeted batches on a thread pool and upsert each batch as it finishes.
+
+    :param collection: A chromadb Collection
+    :param chunks: A list of Document objects
+    :param ids: A list of ids aligned with chunks
+    :param embedding_function: A LangChain Embeddings object
+    :param max_workers: Maximum number of batches in flight
+    :param max_tokens: Maximum number of tokens per batch
+    :param max_items: Maximum number of chunks per batch
+
+    :return: A dict with the number of batches, chunks and rate limits seen, and the time spent writing
+    """
+    texts = [chunk.page_content for chunk in chunks]
+    batches = batch_by_tokens(texts, max_tokens=max_tokens, max_items=max_items)
+    limiter = AdaptiveConcurrency(max_workers)
+    cancelled = threading.Event()
+    write_seconds = 0.0
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {
+            executor.submit(
+                embed_with_retry, embedding_function, [texts[i] for i in batch], limiter, cancelled=cancelled
+            ): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            batch = futures[future]
+            write_start = time.perf_counter()
+            _upsert(
+                collection,
+                ids=[ids[i] for i in batch],
+                embeddings=future.result(),
+                documents=[texts[i] for i in batch],
+                metadatas=[chunks[i].metadata for i in batch]
+            )
+            write_seconds += time.perf_counter() - write_start
+    except BaseException:
+        # The ingestion has failed: drop queued batches and stop retrying the running ones
+        # instead of waiting out their backoff
+        cancelled.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+
+    return {
+        "batches": len(batches),
+        "chunks": len(chunks),
+        "rate_limited": limiter.rate_limited,
+        "write_seconds": write_seconds,
+    }
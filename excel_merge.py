@@ -0,0 +1,206 @@
+import io
+import hashlib
+import threading
+import importlib.util
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from postprocess import normalize_dates
+from uploads import hash_file
+
+TEMPLATE_COLUMNS = ["NO", "HARI", "TANGGAL", "AGENDA", "LOKASI", "REQUESTOR", "LAYANAN", "TYPE_ACARA", "SITE", "WORKING_HOUR"]
+# Rows above the header: title on row 1, the header itself on row 3 (0-based)
+TEMPLATE_HEADER_ROW = 3
+# A generated row is a duplicate of a template row when these match
+KEY_COLUMNS = ["TANGGAL", "AGENDA", "LOKASI"]
+TITLE = "SUPPORT LAYANAN SOUND SYSTEM & MULTIMEDIA SSC ICT RU VI BALONGAN"
+COLUMN_WIDTHS = {
+    "NO": 5, "HARI": 10, "TANGGAL": 15, "AGENDA": 30,
+    "LOKASI": 25, "REQUESTOR": 20, "LAYANAN": 20,
+    "TYPE_ACARA": 20, "SITE": 15, "WORKING_HOUR": 15
+}
+
+
+def default_engine():
+    """
+    Return the fastest installed read_excel engine: calamine (Rust) if available, else openpyxl.
+    """
+    return "calamine" if importlib.util.find_spec("python_calamine") is not None else "openpyxl"
+
+
+def hash_rows(df, columns=KEY_COLUMNS):
+    """
+    Return one 64-bit hash per row of the key columns, ignoring case and surrounding spaces.
+    """
+    if df.empty:
+        return np.empty(0, dtype=np.uint64)
+    normalized = pd.DataFrame({
+        column: df[column].fillna("").astype(str).str.strip().str.casefold() for column in columns
+    })
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+
+def frame_digest(df):
+    """
+    Return a hex digest of a DataFrame's contents, used to detect unchanged inputs across reruns.
+    """
+    row_hashes = pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy()
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()
+
+
+class Template:
+    """
+    A parsed Excel template with the key index of its rows.
+    """
+
+    def __init__(self, df, content_hash):
+        self.df = df
+        self.content_hash = content_hash
+        self.keys = hash_rows(df)
+        numbers = df["NO"].dropna()
+        self.last_no = int(numbers.max()) if len(numbers) else 0
+
+
+def read_template(data, engine=None, content_hash=None):
+    """
+    Parse an Excel template.
+
+    The openpyxl engine reads in read-only mode, so only the cell values are
+    streamed; calamine is several times faster when installed.
+
+    :param data: The xlsx file content, as bytes or a file-like object such as an UploadedFile
+    :param engine: A pandas read_excel engine, default_engine() when omitted
+    :param content_hash: The SHA-256 of the content, hashed here when omitted
+
+    :return: A Template
+    """
+    source = data if hasattr(data, "read") else io.BytesIO(data)
+    content_hash = content_hash or hash_file(source)
+    source.seek(0)
+    df = pd.read_excel(source, skiprows=TEMPLATE_HEADER_ROW, engine=engine or default_engine())
+    df = df.iloc[:, :len(TEMPLATE_COLUMNS)]
+    df.columns = TEMPLATE_COLUMNS
+    # Same format as the extracted rows, so KEY_COLUMNS compare equal
+    df["TANGGAL"] = normalize_dates(df["TANGGAL"])
+    df["NO"] = pd.to_numeric(df["NO"], errors="coerce")
+    return Template(df, content_hash)
+
+
+class TemplateCache:
+    """
+    Small LRU cache of parsed templates keyed by the hash of the file bytes.
+    """
+
+    def __init__(self, max_templates=4, engine=None):
+        self.max_templates = max_templates
+        self.engine = engine
+        self.hits = 0
+        self.misses = 0
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, data):
+        """
+        Return the parsed Template of an xlsx file, parsing it only on a miss.
+
+        :param data: The file content, as bytes or a file-like object
+        """
+        source = data if hasattr(data, "read") else io.BytesIO(data)
+        content_hash = hash_file(source)
+        with self._lock:
+            template = self._templates.get(content_hash)
+            if template is not None:
+                self._templates.move_to_end(content_hash)
+                self.hits += 1
+                return template
+            self.misses += 1
+        template = read_template(source, engine=self.engine, content_hash=content_hash)
+        with self._lock:
+            self._templates[content_hash] = template
+            while len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+        return template
+
+
+def select_new_rows(template, generated):
+    """
+    Return the generated rows that are not in the template yet, numbered after its last NO.
+
+    Rows are compared on KEY_COLUMNS through their hashes; duplicates within
+    the generated rows are dropped as well.
+
+    :param template: A Template
+    :param generated: A DataFrame with the extraction columns (no NO)
+
+    :return: A DataFrame with TEMPLATE_COLUMNS
+    """
+    if generated.empty:
+        return pd.DataFrame(columns=TEMPLATE_COLUMNS)
+    keys = hash_rows(generated)
+    is_new = ~np.isin(keys, template.keys) & ~pd.Series(keys).duplicated().to_numpy()
+    new_rows = generated.loc[is_new].reset_index(drop=True)
+    new_rows.insert(0, "NO", range(template.last_no + 1, template.last_no + 1 + len(new_rows)))
+    return new_rows.reindex(columns=TEMPLATE_COLUMNS)
+
+
+def write_workbook(template, new_rows, output=None):
+    """
+    Write the template rows followed by the new rows with xlsxwriter in constant_memory mode.
+
+    constant_memory flushes every row as soon as the next one starts, so
+    the title and header are written before the data, strictly top to bottom.
+
+    :param template: A Template
+    :param new_rows: A DataFrame from select_new_rows
+    :param output: A path or binary file object, a new BytesIO when omitted
+
+    :return: The output; a BytesIO is rewound to the start
+    """
+    import xlsxwriter
+
+    if output is None:
+        output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+    worksheet = workbook.add_worksheet("Sheet1")
+    title_format = workbook.add_format({
+        'bold': True,
+        'align': 'center',
+        'valign': 'vcenter',
+        'font_size': 14,
+        'font_name': 'Arial'
+    })
+    header_format = workbook.add_format({'bold': True, 'border': 1})
+
+    for col_num, width in enumerate(COLUMN_WIDTHS.values()):
+        worksheet.set_column(col_num, col_num, width)
+    worksheet.merge_range(1, 0, 1, len(TEMPLATE_COLUMNS) - 1, TITLE, title_format)
+    worksheet.write_row(TEMPLATE_HEADER_ROW, 0, TEMPLATE_COLUMNS, header_format)
+
+    row_num = TEMPLATE_HEADER_ROW + 1
+    for frame in (template.df, new_rows):
+        # NaN is not a valid cell value; None is written as an empty cell
+        values = frame.astype(object).where(frame.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            worksheet.write_row(row_num, 0, row)
+            row_num += 1
+    workbook.close()
+
+    if isinstance(output, io.BytesIO):
+        output.seek(0)
+    return output
+
+
+def merge_into_template(template, generated):
+    """
+    Merge generated rows into a template and render the workbook.
+
+    :param template: A Template
+    :param generated: A DataFrame with the extraction columns
+
+    :return: A (merged DataFrame, new rows DataFrame, xlsx bytes) tuple
+    """
+    new_rows = select_new_rows(template, generated)
+    merged_df = pd.concat([template.df, new_rows], ignore_index=True) if len(new_rows) else template.df
+    return merged_df, new_rows, write_workbook(template, new_rows).getvalue()
@@ -1,22 +1,73 @@
-from langchain.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain.vectorstores import Chroma
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.pydantic_v1 import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError, field_validator
 
 import os
-import tempfile
+import time
 import uuid
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+import httpx
 import pandas as pd
 import re
 import json
 from dotenv import load_dotenv
+from ocr import OCRCache, apply_ocr, available_cores
+from json_stream import JSONObjectStream, iter_json_objects
+from result_cache import ExtractionResultCache, make_result_key
+from chunking import chunk_documents, split_recursive, fits_whole, WholeDocumentStore
+from tracing import logger, span, record, TracingCallbackHandler
+from vectorstore_manager import VectorStoreManager, collection_name
+from uploads import hash_file
+from postprocess import MAX_EVENT_DAYS, expand_row, expand_rows, parse_dates, split_ranges
+
+# LangChain's OpenAI and Chroma integrations, chromadb, PyMuPDF and numpy are
+# imported inside the functions that need them, so importing this module (and
+# every Streamlit cold start) does not pay for them until the first upload
 
 # Load environment variables
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Point at an OpenAI-compatible server, e.g. benchmarks/fake_openai.py
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+CHAT_MODEL = "gpt-4o-mini"
+CHUNK_SIZE = 1500
+CHUNK_OVERLAP = 200
+# "auto" sends letters that fit in the prompt whole and splits longer ones by layout
+CHUNKING_STRATEGY = os.getenv("CHUNKING_STRATEGY", "auto")
+VECTORSTORE_PATH = "db"
+EMBEDDING_CACHE_PATH = os.path.join(VECTORSTORE_PATH, "embedding_cache.sqlite")
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "256"))
+OCR_CACHE_PATH = os.path.join(VECTORSTORE_PATH, "ocr_cache.sqlite")
+RESULT_CACHE_PATH = os.path.join(VECTORSTORE_PATH, "extraction_cache.sqlite")
+RESULT_CACHE_TTL_HOURS = float(os.getenv("RESULT_CACHE_TTL_HOURS", "168"))
+RESULT_CACHE_MAX_MB = int(os.getenv("RESULT_CACHE_MAX_MB", "64"))
+VECTORSTORE_MAX_COLLECTIONS = int(os.getenv("VECTORSTORE_MAX_COLLECTIONS", "200"))
+VECTORSTORE_MAX_MB = int(os.getenv("VECTORSTORE_MAX_MB", "512"))
+VECTORSTORE_MAX_AGE_DAYS = float(os.getenv("VECTORSTORE_MAX_AGE_DAYS", "30"))
+# Collections up to this many chunks are queried from an in-memory NumPy index (0 disables it).
+# Loading the index costs about 0.2 ms per chunk and saves a few ms per query, and a letter gets
+# about one query, so it only pays off for small collections (see benchmarks/bench_retrieval.py)
+NUMPY_INDEX_MAX_CHUNKS = int(os.getenv("NUMPY_INDEX_MAX_CHUNKS", "32"))
+
+# LLM calls a structured extraction may spend on fixing invalid rows, per letter
+ROW_RETRY_BUDGET = int(os.getenv("ROW_RETRY_BUDGET", "3"))
+
+# Maximum number of (vectorstore, model, prompt) chains kept alive
+CHAIN_REGISTRY_SIZE = 64
+
+_embedding_cache = None
+_ocr_cache = None
+_result_cache = None
+_vectorstore_manager = None
+_http_client = None
+_embedding_function = None
+_llms = {}
+_chain_registry = OrderedDict()
+_structured_runnables = {}
+_registry_lock = threading.Lock()
 
 def clean_filename(filename):
     # First, remove file extension if present
@@ -48,74 +99,487 @@ def clean_filename(filename):
     
     return clean_name
 
+def hash_bytes(data):
+    """
+    Return the SHA-256 hex digest of a bytes object.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+def get_ingestion_key(content_hash, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, embedding_model=EMBEDDING_MODEL,
+                      strategy=CHUNKING_STRATEGY):
+    """
+    Build the cache key of an ingested PDF.
+
+    The key covers the uploaded bytes and every parameter that changes the
+    stored chunks or their vectors, so a hit means the persisted collection
+    can be reused as-is.
+
+    :param content_hash: The hash_bytes digest of the uploaded PDF
+    :param chunk_size: Chunk size passed to the text splitter
+    :param chunk_overlap: Chunk overlap passed to the text splitter
+    :param embedding_model: Name of the embedding model
+    :param strategy: The chunking strategy
+
+    :return: A hex digest identifying this ingestion
+    """
+    params = json.dumps({
+        "content_hash": content_hash,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "embedding_model": embedding_model,
+        "strategy": strategy,
+    }, sort_keys=True)
+    return hashlib.sha256(params.encode("utf-8")).hexdigest()
+
+def get_ocr_cache():
+    """
+    Return the process-wide OCR result cache, opening it on first use.
+    """
+    global _ocr_cache
+    with _registry_lock:
+        if _ocr_cache is None:
+            _ocr_cache = OCRCache(OCR_CACHE_PATH)
+        return _ocr_cache
+
+def load_pdf_documents(pdf, ocr_workers=None):
+    """
+    Extract per-page documents from an opened PDF, falling back to OCR for scanned pages.
+
+    :param pdf: A PDFDocument
+    :param ocr_workers: Size of the OCR process pool, every available core when omitted
+
+    :return: A list of Document objects, one per page
+    """
+    with span("pdf_parse", pages=pdf.page_count):
+        documents = pdf.load()
+    with span("ocr") as attrs:
+        documents = apply_ocr(pdf, documents, cache=get_ocr_cache(), max_workers=ocr_workers)
+        attrs["pages"] = sum(1 for doc in documents if doc.metadata.get("ocr"))
+    return documents
+
 def get_pdf_text(uploaded_file): 
-    try:
-        input_file = uploaded_file.read()
-        temp_file = tempfile.NamedTemporaryFile(delete=False)
-        temp_file.write(input_file)
-        temp_file.close()
-        loader = PyPDFLoader(temp_file.name)
-        documents = loader.load()
-        return documents
-    finally:
-        os.unlink(temp_file.name)
-
-def split_document(documents, chunk_size=1500, chunk_overlap=200):    
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len,
-        separators=["\n\n", "\n", " "]
-    )
-    return text_splitter.split_documents(documents)
+    from pdf_engine import open_pdf
+    with open_pdf(uploaded_file) as pdf:
+        return load_pdf_documents(pdf)
+
+def split_document(documents, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):    
+    return split_recursive(documents, chunk_size, chunk_overlap)
+
+def get_embedding_cache():
+    """
+    Return the process-wide on-disk embedding cache, opening it on first use.
+    """
+    from embedding_cache import EmbeddingCache
+    global _embedding_cache
+    with _registry_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache(
+                EMBEDDING_CACHE_PATH,
+                max_bytes=EMBEDDING_CACHE_MAX_MB * 1024 * 1024
+            )
+        return _embedding_cache
+
+def get_http_client():
+    """
+    Return the keep-alive HTTP client shared by every embedding and chat call.
+    """
+    global _http_client
+    with _registry_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+                timeout=httpx.Timeout(60.0, connect=10.0)
+            )
+        return _http_client
 
 def get_embedding_function():
-    return OpenAIEmbeddings(
-        model="text-embedding-3-small", 
-        openai_api_key=OPENAI_API_KEY
-    )
+    from langchain_openai import OpenAIEmbeddings
+    from embedding_cache import CachedEmbeddings
+    global _embedding_function
+    # Taken before the lock, which they acquire themselves
+    http_client = get_http_client()
+    embedding_cache = get_embedding_cache()
+    with _registry_lock:
+        if _embedding_function is None:
+            embeddings = OpenAIEmbeddings(
+                model=EMBEDDING_MODEL, 
+                openai_api_key=OPENAI_API_KEY,
+                openai_api_base=OPENAI_BASE_URL,
+                http_client=http_client,
+                # embedding_pipeline.embed_with_retry owns retries, so its limiter sees every 429
+                max_retries=0
+            )
+            _embedding_function = CachedEmbeddings(embeddings, embedding_cache, EMBEDDING_MODEL)
+        return _embedding_function
 
-def create_vectorstore(chunks, embedding_function, file_name, vector_store_path="db"):
-    ids = [str(uuid.uuid5(uuid.NAMESPACE_DNS, doc.page_content)) for doc in chunks]
-    unique_ids = set()
-    unique_chunks = []
-    for chunk, id in zip(chunks, ids):     
-        if id not in unique_ids:       
-            unique_ids.add(id)
-            unique_chunks.append(chunk)        
-    vectorstore = Chroma.from_documents(
-        documents=unique_chunks, 
-        collection_name=clean_filename(file_name),
-        embedding=embedding_function, 
-        ids=list(unique_ids), 
-        persist_directory=vector_store_path
-    )
-    vectorstore.persist()
+def build_chunk_index(chunks):
+    """
+    Assign every chunk its content-hash id, keeping document order.
+
+    Chunks with identical content share an id, and only the first one is kept.
+
+    :param chunks: A list of Document objects
+
+    :return: A dict mapping ids to chunks, in the order of the chunks
+    """
+    chunk_index = {}
+    for chunk in chunks:
+        chunk_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, chunk.page_content))
+        chunk_index.setdefault(chunk_id, chunk)
+    return chunk_index
+
+def sync_collection(collection, chunk_index, embedding_function):
+    """
+    Make a collection hold exactly the chunks of an index, embedding only what is new.
+
+    Chunks already stored under the same content-hash id are kept, and only
+    their metadata is refreshed if it moved (e.g. to another page). Stored
+    chunks missing from the index are deleted.
+
+    :param collection: A chromadb Collection
+    :param chunk_index: A dict returned by build_chunk_index
+    :param embedding_function: A LangChain Embeddings object
+
+    :return: A dict with the number of added, updated, deleted and unchanged chunks
+    """
+    existing = collection.get(include=["metadatas"])
+    existing_metadata = dict(zip(existing["ids"], existing["metadatas"]))
+
+    new_ids = [chunk_id for chunk_id in chunk_index if chunk_id not in existing_metadata]
+    stale_ids = [chunk_id for chunk_id in existing_metadata if chunk_id not in chunk_index]
+    moved_ids = [
+        chunk_id for chunk_id, chunk in chunk_index.items()
+        if chunk_id in existing_metadata
+        and chunk.metadata
+        and (existing_metadata[chunk_id] or {}) != chunk.metadata
+    ]
+
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+    if moved_ids:
+        collection.update(
+            ids=moved_ids,
+            metadatas=[chunk_index[chunk_id].metadata for chunk_id in moved_ids]
+        )
+    if new_ids:
+        from embedding_pipeline import embed_into_collection
+        cache = getattr(embedding_function, "cache", None)
+        hits_before = cache.hits if cache is not None else 0
+        with span("embed", chunks=len(new_ids)) as attrs:
+            stats = embed_into_collection(
+                collection,
+                [chunk_index[chunk_id] for chunk_id in new_ids],
+                new_ids,
+                embedding_function
+            )
+            attrs["batches"] = stats["batches"]
+            attrs["rate_limited"] = stats["rate_limited"]
+            if cache is not None:
+                attrs["cache_hits"] = cache.hits - hits_before
+        record("chroma_write", stats["write_seconds"] * 1000, chunks=len(new_ids))
+
+    return {
+        "added": len(new_ids),
+        "updated": len(moved_ids),
+        "deleted": len(stale_ids),
+        "unchanged": len(chunk_index) - len(new_ids) - len(moved_ids),
+    }
+
+def get_vectorstore_manager():
+    """
+    Return the process-wide Chroma client and collection registry, opening it on first use.
+    """
+    global _vectorstore_manager
+    with _registry_lock:
+        if _vectorstore_manager is None:
+            _vectorstore_manager = VectorStoreManager(
+                VECTORSTORE_PATH,
+                max_collections=VECTORSTORE_MAX_COLLECTIONS,
+                max_bytes=VECTORSTORE_MAX_MB * 1024 * 1024,
+                max_age_seconds=VECTORSTORE_MAX_AGE_DAYS * 24 * 3600
+            )
+        return _vectorstore_manager
+
+def create_vectorstore(chunks, embedding_function, content_hash, file_name=None):
+    """
+    Write chunks into the collection of a document and register it.
+
+    :param chunks: A list of Document objects
+    :param embedding_function: A LangChain Embeddings object
+    :param content_hash: Content hash of the document, which names the collection
+    :param file_name: The name of the uploaded file, kept in the registry for reference
+
+    :return: A Chroma vector store object
+    """
+    manager = get_vectorstore_manager()
+    name = collection_name(content_hash)
+    vectorstore = manager.get_vectorstore(name, embedding_function)
+    sync_collection(vectorstore._collection, build_chunk_index(chunks), embedding_function)
+    manager.register(name, content_hash, file_name)
+    with span("vectorstore_gc") as attrs:
+        attrs["deleted"] = len(manager.gc(keep=(name,)))
+        if attrs["deleted"]:
+            try:
+                attrs.update(manager.compact())
+            except Exception as e:
+                logger.warning("Gagal memadatkan vector store: %s", e)
     return vectorstore
 
-def create_vectorstore_from_texts(documents, file_name):
-    docs = split_document(documents)
+def create_vectorstore_from_texts(documents, file_name, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP,
+                                  strategy="recursive", pdf=None, content_hash=None):
+    with span("split", strategy=strategy) as attrs:
+        docs = chunk_documents(documents, strategy, chunk_size=chunk_size, chunk_overlap=chunk_overlap, pdf=pdf)
+        attrs["chunks"] = len(docs)
+    if content_hash is None:
+        if pdf is not None:
+            content_hash = pdf.content_hash
+        else:
+            content_hash = hash_bytes("\n\n".join(doc.page_content for doc in documents).encode("utf-8"))
     embedding_function = get_embedding_function()
-    vectorstore = create_vectorstore(docs, embedding_function, file_name)
+    vectorstore = create_vectorstore(docs, embedding_function, content_hash, file_name)
     return vectorstore
 
-def load_vectorstore(file_name, vectorstore_path="db"):
+class VectorStoreEvicted(Exception):
+    """
+    Raised when a vector store's collection was deleted by gc; ingest the document again.
+    """
+
+def touch_vectorstore(vectorstore):
+    """
+    Mark the collection behind a vector store as just used, so gc evicts it last.
+
+    :param vectorstore: A store returned by ingest_pdf or get_cached_vectorstore
+
+    :return: False if the collection was evicted and the store can no longer be queried
+    """
+    content_hash = get_document_hash(vectorstore)
+    if content_hash is None:
+        return True
+    manager = get_vectorstore_manager()
+    name = collection_name(content_hash)
+    used = manager.touch(name)
+    # WholeDocumentStore and NumpyVectorStore hold their content in memory and keep working
+    if not hasattr(vectorstore, "_collection"):
+        return True
+    return used and manager.is_open(name, vectorstore)
+
+def require_vectorstore(vectorstore):
+    """
+    Touch a vector store before querying it, raising VectorStoreEvicted if its collection is gone.
+    """
+    if not touch_vectorstore(vectorstore):
+        with _registry_lock:
+            for key in [key for key, entry in _chain_registry.items() if entry[0] is vectorstore]:
+                del _chain_registry[key]
+        raise VectorStoreEvicted("Koleksi dokumen sudah dihapus dari vector store, unggah ulang dokumen")
+
+def load_vectorstore(content_hash):
     embedding_function = get_embedding_function()
-    return Chroma(
-        persist_directory=vectorstore_path, 
-        embedding_function=embedding_function, 
-        collection_name=clean_filename(file_name)
+    return get_vectorstore_manager().get_vectorstore(collection_name(content_hash), embedding_function)
+
+def get_retrieval_store(vectorstore, content_hash=None):
+    """
+    Swap a small Chroma collection for an in-memory NumPy index over the same vectors.
+
+    The collection stays the persisted copy; only queries take the fast path.
+
+    :param vectorstore: A Chroma vector store object
+    :param content_hash: Content hash of the document
+
+    :return: A NumpyVectorStore, or the Chroma store itself above NUMPY_INDEX_MAX_CHUNKS
+    """
+    if vectorstore._collection.count() > NUMPY_INDEX_MAX_CHUNKS:
+        return vectorstore
+    from numpy_index import NumpyVectorStore
+    return NumpyVectorStore.from_collection(
+        vectorstore._collection,
+        vectorstore._embedding_function,
+        document_hash=content_hash
     )
 
+def get_cached_vectorstore(content_hash, ingestion_key):
+    """
+    Return the persisted collection of a document if it was built with the same ingestion key.
+
+    :param content_hash: Content hash of the uploaded PDF
+    :param ingestion_key: The key returned by get_ingestion_key
+
+    :return: A Chroma vector store object, or None on a cache miss
+    """
+    manager = get_vectorstore_manager()
+    name = collection_name(content_hash)
+    # Look the collection up without creating it, letters sent whole never get one
+    collection = manager.get_collection(name)
+    if collection is None:
+        return None
+    metadata = collection.metadata or {}
+    if metadata.get("ingestion_key") == ingestion_key and collection.count() > 0:
+        manager.touch(name)
+        return get_retrieval_store(load_vectorstore(content_hash), content_hash)
+    return None
+
+def ingest_pdf(uploaded_file, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, ingestion_key=None, pdf=None,
+               strategy=CHUNKING_STRATEGY, ocr_workers=None):
+    """
+    Parse, split and embed an uploaded PDF unless an identical ingestion is already persisted.
+
+    With the "auto" strategy a letter that fits in WHOLE_DOCUMENT_MAX_TOKENS is
+    not embedded at all: a WholeDocumentStore hands the full text to the chain.
+
+    :param uploaded_file: A SpooledUpload, or a file-like object with the PDF content and a name
+    :param chunk_size: Chunk size passed to the text splitter
+    :param chunk_overlap: Chunk overlap passed to the text splitter
+    :param ingestion_key: A precomputed ingestion key, computed from the file when omitted
+    :param pdf: An already opened PDFDocument of the upload, reused instead of parsing again
+    :param strategy: One of chunking.CHUNKING_STRATEGIES
+    :param ocr_workers: Size of the OCR process pool, every available core when omitted
+
+    :return: A Chroma vector store object, a NumpyVectorStore for small collections, or a WholeDocumentStore
+    """
+    if pdf is not None:
+        content_hash = pdf.content_hash
+    else:
+        content_hash = getattr(uploaded_file, "content_hash", None) or hash_file(uploaded_file)
+    if ingestion_key is None:
+        ingestion_key = get_ingestion_key(content_hash, chunk_size, chunk_overlap, strategy=strategy)
+
+    with span("ingestion_cache") as attrs:
+        vectorstore = get_cached_vectorstore(content_hash, ingestion_key)
+        attrs["cache_hit"] = vectorstore is not None
+    if vectorstore is not None:
+        return vectorstore
+
+    owns_pdf = pdf is None
+    if owns_pdf:
+        from pdf_engine import open_pdf
+        pdf = open_pdf(uploaded_file)
+    try:
+        documents = load_pdf_documents(pdf, ocr_workers=ocr_workers)
+        if strategy == "whole" or (strategy == "auto" and fits_whole(documents)):
+            record("split", 0.0, strategy="whole", chunks=1)
+            return WholeDocumentStore(documents, document_hash=content_hash)
+
+        vectorstore = create_vectorstore_from_texts(
+            documents,
+            file_name=uploaded_file.name,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            strategy="layout" if strategy == "auto" else strategy,
+            pdf=pdf,
+            content_hash=content_hash
+        )
+    finally:
+        if owns_pdf:
+            pdf.close()
+
+    vectorstore._collection.modify(metadata={
+        "ingestion_key": ingestion_key,
+        "content_hash": content_hash,
+    })
+    return get_retrieval_store(vectorstore, content_hash)
+
+# Define expected columns to ensure consistent schema
+EXPECTED_COLUMNS = [
+    "HARI", "TANGGAL", "AGENDA", "LOKASI", 
+    "REQUESTOR", "LAYANAN", "TYPE_ACARA", "SITE", "WORKING_HOUR"
+]
+
+# What the model writes: one row per event, HARI and the per-day rows come from postprocess.expand_rows
+EVENT_COLUMNS = [
+    "TANGGAL", "TANGGAL_SELESAI", "AGENDA", "LOKASI",
+    "REQUESTOR", "LAYANAN", "TYPE_ACARA", "SITE", "WORKING_HOUR"
+]
+
+class ExtractionEvent(BaseModel):
+    """
+    One event as extracted by the model, with the columns of EVENT_COLUMNS.
+    """
+    TANGGAL: str = Field("", description="Tanggal mulai, contoh: 02 January 2025")
+    TANGGAL_SELESAI: str = Field("", description="Tanggal terakhir jika kegiatan lebih dari sehari, selain itu kosong")
+    AGENDA: str = Field("", description="Perihal kegiatan")
+    LOKASI: str = Field("", description="Lokasi kegiatan")
+    REQUESTOR: str = Field("", description="Fungsi yang menandatangani surat")
+    LAYANAN: str = Field("", description="Sound System atau Sound System & Multimedia")
+    TYPE_ACARA: str = Field("", description="Dibiarkan kosong")
+    SITE: str = Field("", description="Bumi Patra, Kilang RU VI Balongan, atau Office RU VI Balongan")
+    WORKING_HOUR: str = Field("", description="Yes atau No")
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def coerce_to_string(cls, value):
+        if value is None:
+            return ""
+        return value if isinstance(value, str) else str(value)
+
+class ExtractionResult(BaseModel):
+    """
+    All events extracted from one letter, the schema used for structured output.
+    """
+    rows: list[ExtractionEvent] = Field(default_factory=list, description="Satu baris untuk setiap kegiatan")
+
+LAYANAN_OPTIONS = ("Sound System", "Sound System & Multimedia")
+SITE_OPTIONS = ("Bumi Patra", "Kilang RU VI Balongan", "Office RU VI Balongan")
+
+def row_problems(row):
+    """
+    Check the values of an event row beyond its types.
+
+    :param row: A dict with the columns of EVENT_COLUMNS
+
+    :return: A list of problem descriptions, empty if the row is valid
+    """
+    problems = []
+    start, range_end = split_ranges([row["TANGGAL"]])
+    end = parse_dates([row["TANGGAL_SELESAI"]]) if row["TANGGAL_SELESAI"].strip() else range_end
+    if pd.isna(start[0]):
+        problems.append("TANGGAL harus berformat '02 January 2025'")
+    elif row["TANGGAL_SELESAI"].strip() and pd.isna(end[0]):
+        problems.append("TANGGAL_SELESAI harus berformat '02 January 2025' atau dikosongkan")
+    elif pd.notna(end[0]) and abs((end[0] - start[0]).days) + 1 > MAX_EVENT_DAYS:
+        problems.append(f"Kegiatan lebih dari {MAX_EVENT_DAYS} hari, periksa TANGGAL dan TANGGAL_SELESAI")
+    if row["LAYANAN"] not in LAYANAN_OPTIONS:
+        problems.append(f"LAYANAN harus salah satu dari: {', '.join(LAYANAN_OPTIONS)}")
+    if row["SITE"] not in SITE_OPTIONS:
+        problems.append(f"SITE harus salah satu dari: {', '.join(SITE_OPTIONS)}")
+    if row["WORKING_HOUR"] not in ("Yes", "No"):
+        problems.append("WORKING_HOUR harus Yes atau No")
+    return problems
+
+def validate_row(obj):
+    """
+    Validate a parsed JSON object against the event schema.
+
+    :param obj: A dict parsed from the LLM answer
+
+    :return: A dict with exactly the columns of EVENT_COLUMNS, or None if the object is not a row
+    """
+    if not isinstance(obj, dict) or not any(col in obj for col in EXPECTED_COLUMNS):
+        return None
+    try:
+        return ExtractionEvent.model_validate(obj).model_dump()
+    except ValidationError as e:
+        logger.warning("Baris tidak valid dilewati: %s", e)
+        return None
+
+EXTRACTION_QUERY = (
+    "Berikan saya TANGGAL (tanggal mulai, contoh: 02 January 2025, nama bulan dalam bahasa Inggris), "
+    "TANGGAL_SELESAI (tanggal terakhir jika kegiatan lebih dari sehari, kosongkan jika hanya sehari), AGENDA (perihal kegiatan), LOKASI, REQUESTOR (lihat di yang menandatangani misal Section Head Safety, "
+    "isikan Safety), LAYANAN (Sound System atau Sound System & Multimedia [contoh multimedia: proyektor, "
+    "microphone, screen, dan lain-lain]), TYPE_ACARA (biarkan kosong), SITE (Bumi Patra, atau Kilang RU VI "
+    "Balongan, atau Office RU VI Balongan, Pilih salah satu sesuaikan dengan lokasi), dan WORKING_HOUR "
+    "(Yes atau No)."
+)
+
 PROMPT_TEMPLATE = """
 Anda adalah staf data entry yang ditugaskan untuk mengekstrak informasi dari dokumen surat. 
-Jika agenda lebih dari sehari maka jumlah json dibuat sesuai dengan jumlah hari.
+Buat satu json untuk setiap kegiatan. Jika kegiatan lebih dari sehari, isi TANGGAL dengan tanggal mulai
+dan TANGGAL_SELESAI dengan tanggal terakhir; baris untuk setiap hari dibuat otomatis.
 Gunakan potongan konteks yang diberikan di bawah ini untuk menjawab pertanyaan.
 Berikan jawaban dalam format JSON dengan struktur berikut:
 
 {{
-    "HARI": "string",
     "TANGGAL": "date",
+    "TANGGAL_SELESAI": "date",
     "AGENDA": "string",
     "LOKASI": "string",
     "REQUESTOR": "string",
@@ -134,6 +598,34 @@ Jawablah pertanyaan berikut berdasarkan konteks di atas dalam format JSON:
 {question}
 """
 
+STRUCTURED_PROMPT_TEMPLATE = """
+Anda adalah staf data entry yang ditugaskan untuk mengekstrak informasi dari dokumen surat. 
+Buat satu baris untuk setiap kegiatan. Jika kegiatan lebih dari sehari, isi TANGGAL dengan tanggal mulai
+dan TANGGAL_SELESAI dengan tanggal terakhir; baris untuk setiap hari dibuat otomatis.
+Gunakan potongan konteks yang diberikan di bawah ini untuk menjawab pertanyaan.
+
+Konteks:
+{context}
+
+---
+
+{question}
+"""
+
+ROW_RETRY_TEMPLATE = """
+Baris berikut diekstrak dari surat di bawah ini, tetapi tidak valid:
+{row}
+
+Masalah: {problems}
+
+Perbaiki baris tersebut berdasarkan konteks.
+
+Konteks:
+{context}
+
+---
+"""
+
 def format_docs(docs):
     """
     Format a list of Document objects into a single string.
@@ -144,40 +636,365 @@ def format_docs(docs):
     """
     return "\n\n".join(doc.page_content for doc in docs)
 
-def query_document(vectorstore, query):
+def get_llm(model=CHAT_MODEL):
+    """
+    Return the shared chat model client for a model name.
+    """
+    from langchain_openai import ChatOpenAI
+    http_client = get_http_client()
+    with _registry_lock:
+        if model not in _llms:
+            _llms[model] = ChatOpenAI(
+                model=model,
+                api_key=OPENAI_API_KEY,
+                base_url=OPENAI_BASE_URL,
+                http_client=http_client,
+                stream_usage=True
+            )
+        return _llms[model]
+
+def build_rag_chain(retriever, llm, prompt=PROMPT_TEMPLATE):
+    """
+    Compose the retrieval chain: retrieved context and question into the prompt, then the LLM.
+    """
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.runnables import RunnablePassthrough
+    prompt_template = ChatPromptTemplate.from_template(prompt)
+    return (
+        {"context": retriever | format_docs, "question": RunnablePassthrough()}
+        | prompt_template
+        | llm
+    )
+
+def get_rag_chain(vectorstore, model=CHAT_MODEL, prompt=PROMPT_TEMPLATE):
+    """
+    Return the retrieval chain of a vector store, building it on first use.
+
+    Chains are kept per (vectorstore, model, prompt) in a bounded LRU
+    registry, so repeated queries reuse the retriever, prompt and LLM client.
+
+    :param vectorstore: A Chroma vector store object
+    :param model: Name of the chat model
+    :param prompt: The prompt template string
+
+    :return: A runnable taking the question and returning the LLM message
+    """
+    require_vectorstore(vectorstore)
+    key = (id(vectorstore), model, hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+    with _registry_lock:
+        entry = _chain_registry.get(key)
+        # id() can be reused after a vector store is garbage collected
+        if entry is not None and entry[0] is vectorstore:
+            _chain_registry.move_to_end(key)
+            return entry[1]
+
+    rag_chain = build_rag_chain(
+        vectorstore.as_retriever(search_type="similarity"),
+        get_llm(model),
+        prompt
+    )
+
+    with _registry_lock:
+        _chain_registry[key] = (vectorstore, rag_chain)
+        _chain_registry.move_to_end(key)
+        while len(_chain_registry) > CHAIN_REGISTRY_SIZE:
+            _chain_registry.popitem(last=False)
+    return rag_chain
+
+def get_result_cache():
+    """
+    Return the process-wide extraction result cache, opening it on first use.
+    """
+    global _result_cache
+    with _registry_lock:
+        if _result_cache is None:
+            _result_cache = ExtractionResultCache(
+                RESULT_CACHE_PATH,
+                ttl_seconds=RESULT_CACHE_TTL_HOURS * 3600,
+                max_bytes=RESULT_CACHE_MAX_MB * 1024 * 1024
+            )
+        return _result_cache
+
+def get_document_hash(vectorstore):
+    """
+    Return the content hash stored on a collection by ingest_pdf, if any.
+    """
+    # WholeDocumentStore and NumpyVectorStore carry the hash themselves
+    if hasattr(vectorstore, "document_hash"):
+        return vectorstore.document_hash
+    metadata = vectorstore._collection.metadata or {}
+    return metadata.get("content_hash")
+
+def lookup_extraction(vectorstore, query, model=CHAT_MODEL, prompt=PROMPT_TEMPLATE):
+    """
+    Look up the cached rows of an extraction made with a prompt template.
+
+    :return: A (cache_key, rows) tuple; cache_key is None when the vector store
+        has no content hash and rows is None on a miss
+    """
+    document_hash = get_document_hash(vectorstore)
+    if document_hash is None:
+        return None, None
+    cache_key = make_result_key(document_hash, prompt, query, model, get_ingestion_key(document_hash))
+    with span("result_cache") as attrs:
+        rows = get_result_cache().get(cache_key)
+        attrs["cache_hit"] = rows is not None
+    return cache_key, rows
+
+def store_extraction(vectorstore, cache_key, rows):
+    """
+    Store the rows of an extraction found missing by lookup_extraction.
+    """
+    if cache_key is not None and rows:
+        get_result_cache().put(cache_key, get_document_hash(vectorstore), rows)
+
+def invalidate_extraction_cache(document_hash):
+    """
+    Forget the cached extraction results of one document.
+
+    :param document_hash: Content hash of the PDF; None, as get_document_hash returns for a
+        store without one, removes nothing rather than every document's results
+
+    :return: The number of entries removed
+    """
+    if document_hash is None:
+        return 0
+    return get_result_cache().invalidate(document_hash)
+
+def dataframe_to_rows(df):
+    """
+    Convert a DataFrame to JSON-serialisable row dicts, with None for missing values.
+    """
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+def query_document(vectorstore, query, model=CHAT_MODEL, use_cache=True):
     """
     Query a vector store with a question and return a structured response.
 
     :param vectorstore: A Chroma vector store object
     :param query: The question to ask the vector store
+    :param model: Name of the chat model
+    :param use_cache: Return and store results in the extraction result cache
 
     :return: A pandas DataFrame with structured response
     """
-    # Define expected columns to ensure consistent schema
-    expected_columns = [
-        "HARI", "TANGGAL", "AGENDA", "LOKASI", 
-        "REQUESTOR", "LAYANAN", "TYPE_ACARA", "SITE", "WORKING_HOUR"
-    ]
+    if use_cache:
+        cache_key, rows = lookup_extraction(vectorstore, query, model)
+        if rows is not None:
+            return pd.DataFrame(rows, columns=EXPECTED_COLUMNS)
 
-    llm = ChatOpenAI(model="gpt-4o-mini", api_key=OPENAI_API_KEY)
+    rag_chain = get_rag_chain(vectorstore, model)
+    response = rag_chain.invoke(query, config={"callbacks": [TracingCallbackHandler()]})
+    df = parse_response(response)
 
-    retriever = vectorstore.as_retriever(search_type="similarity")
+    if use_cache:
+        store_extraction(vectorstore, cache_key, dataframe_to_rows(df))
+    return df
 
-    prompt_template = ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
+async def aquery_document(vectorstore, query, model=CHAT_MODEL, llm=None, use_cache=True):
+    """
+    Async variant of query_document built on the chain's ainvoke.
 
-    rag_chain = (
-        {"context": retriever | format_docs, "question": RunnablePassthrough()}
-        | prompt_template
-        | llm
-    )
+    :param vectorstore: A Chroma vector store object
+    :param query: The question to ask the vector store
+    :param model: Name of the chat model
+    :param llm: A chat model to use instead of the shared one, e.g. one bound to the running event loop
+    :param use_cache: Return and store results in the extraction result cache
 
-    response = rag_chain.invoke(query)
+    :return: A pandas DataFrame with structured response
+    """
+    # The result cache and the collection registry are SQLite, so they are used off the event loop
+    if use_cache:
+        cache_key, rows = await asyncio.to_thread(lookup_extraction, vectorstore, query, model)
+        if rows is not None:
+            return pd.DataFrame(rows, columns=EXPECTED_COLUMNS)
+
+    if llm is None:
+        rag_chain = await asyncio.to_thread(get_rag_chain, vectorstore, model)
+    else:
+        await asyncio.to_thread(require_vectorstore, vectorstore)
+        rag_chain = build_rag_chain(vectorstore.as_retriever(search_type="similarity"), llm)
+    response = await rag_chain.ainvoke(query, config={"callbacks": [TracingCallbackHandler()]})
+    df = parse_response(response)
+
+    if use_cache:
+        await asyncio.to_thread(store_extraction, vectorstore, cache_key, dataframe_to_rows(df))
+    return df
+
+def stream_query_document(vectorstore, query, model=CHAT_MODEL, use_cache=True):
+    """
+    Query a vector store and yield each row as soon as its JSON object is complete.
+
+    :param vectorstore: A Chroma vector store object
+    :param query: The question to ask the vector store
+    :param model: Name of the chat model
+    :param use_cache: Return and store results in the extraction result cache
+
+    :return: A generator of dicts with the expected columns
+    """
+    if use_cache:
+        cache_key, rows = lookup_extraction(vectorstore, query, model)
+        if rows is not None:
+            yield from rows
+            return
+
+    rag_chain = get_rag_chain(vectorstore, model)
+    parser = JSONObjectStream()
+    rows = []
+    for chunk in rag_chain.stream(query, config={"callbacks": [TracingCallbackHandler()]}):
+        for obj in parser.feed(chunk.content):
+            event = validate_row(obj)
+            if event is None:
+                continue
+            for row in expand_row(event, EXPECTED_COLUMNS):
+                rows.append(row)
+                yield row
+
+    if use_cache:
+        store_extraction(vectorstore, cache_key, rows)
+
+async def astream_query_document(vectorstore, query, model=CHAT_MODEL, llm=None, use_cache=True):
+    """
+    Async variant of stream_query_document built on the chain's astream.
+    """
+    if use_cache:
+        cache_key, rows = await asyncio.to_thread(lookup_extraction, vectorstore, query, model)
+        if rows is not None:
+            for row in rows:
+                yield row
+            return
+
+    if llm is None:
+        rag_chain = await asyncio.to_thread(get_rag_chain, vectorstore, model)
+    else:
+        await asyncio.to_thread(require_vectorstore, vectorstore)
+        rag_chain = build_rag_chain(vectorstore.as_retriever(search_type="similarity"), llm)
+    parser = JSONObjectStream()
+    rows = []
+    async for chunk in rag_chain.astream(query, config={"callbacks": [TracingCallbackHandler()]}):
+        for obj in parser.feed(chunk.content):
+            event = validate_row(obj)
+            if event is None:
+                continue
+            for row in expand_row(event, EXPECTED_COLUMNS):
+                rows.append(row)
+                yield row
+
+    if use_cache:
+        await asyncio.to_thread(store_extraction, vectorstore, cache_key, rows)
+
+def _add_usage(stats, message):
+    usage = getattr(message, "usage_metadata", None) or {}
+    stats["llm_calls"] += 1
+    stats["prompt_tokens"] += usage.get("input_tokens", 0)
+    stats["completion_tokens"] += usage.get("output_tokens", 0)
+
+def get_structured_runnable(model, prompt, schema):
+    """
+    Return the cached prompt | structured-output runnable of a model, prompt and schema.
+
+    :param model: Name of the chat model
+    :param prompt: Prompt template
+    :param schema: The pydantic model the answer is parsed into
+
+    :return: A runnable whose output is a dict with "raw" and "parsed"
+    """
+    from langchain_core.prompts import ChatPromptTemplate
+    llm = get_llm(model)
+    key = (model, prompt, schema)
+    with _registry_lock:
+        if key not in _structured_runnables:
+            _structured_runnables[key] = ChatPromptTemplate.from_template(prompt) | llm.with_structured_output(
+                schema, method="function_calling", include_raw=True
+            )
+        return _structured_runnables[key]
+
+def structured_query_document(vectorstore, query, model=CHAT_MODEL, retry_budget=ROW_RETRY_BUDGET, use_cache=True):
+    """
+    Extract rows through function calling with the ExtractionResult schema.
+
+    The answer is parsed by the schema instead of scanned for JSON. Events
+    whose values fail row_problems are sent back one at a time, with the
+    same context, until they pass or the letter's retry budget is spent;
+    they are then expanded into one row per day.
+
+    :param vectorstore: A vector store object
+    :param query: The question to ask the vector store
+    :param model: Name of the chat model
+    :param retry_budget: Maximum number of extra LLM calls for the letter
+    :param use_cache: Return and store results in the extraction result cache
+
+    :return: A (DataFrame, stats) tuple; stats holds LLM calls, prompt and
+        completion tokens, retries, rows still invalid and elapsed seconds
+    """
+    start = time.perf_counter()
+    stats = {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "retries": 0, "invalid_rows": 0,
+             "cached": False}
+    if use_cache:
+        cache_key, rows = lookup_extraction(vectorstore, query, model, prompt=STRUCTURED_PROMPT_TEMPLATE)
+        if rows is not None:
+            stats.update(cached=True, seconds=time.perf_counter() - start)
+            return pd.DataFrame(rows, columns=EXPECTED_COLUMNS), stats
+
+    require_vectorstore(vectorstore)
+    config = {"callbacks": [TracingCallbackHandler()]}
+    extractor = get_structured_runnable(model, STRUCTURED_PROMPT_TEMPLATE, ExtractionResult)
+    fixer = get_structured_runnable(model, ROW_RETRY_TEMPLATE, ExtractionEvent)
+    with span("structured_extract") as attrs:
+        context = format_docs(vectorstore.as_retriever(search_type="similarity").invoke(query, config=config))
+
+        budget = retry_budget
+        output = extractor.invoke({"context": context, "question": query}, config=config)
+        _add_usage(stats, output["raw"])
+        # Only an answer that does not fit the schema at all costs a whole-letter retry
+        while output["parsed"] is None and budget > 0:
+            budget -= 1
+            stats["retries"] += 1
+            output = extractor.invoke({"context": context, "question": query}, config=config)
+            _add_usage(stats, output["raw"])
+        events = [event.model_dump() for event in output["parsed"].rows] if output["parsed"] is not None else []
+
+        for index, row in enumerate(events):
+            problems = row_problems(row)
+            while problems and budget > 0:
+                budget -= 1
+                stats["retries"] += 1
+                output = fixer.invoke({
+                    "context": context,
+                    "row": json.dumps(row, ensure_ascii=False),
+                    "problems": "; ".join(problems),
+                }, config=config)
+                _add_usage(stats, output["raw"])
+                if output["parsed"] is not None:
+                    row = output["parsed"].model_dump()
+                    problems = row_problems(row)
+            if problems:
+                stats["invalid_rows"] += 1
+                logger.warning("Baris %s masih tidak valid: %s", index + 1, "; ".join(problems))
+            events[index] = row
+        attrs.update({key: value for key, value in stats.items() if key != "cached"})
+
+    with span("expand_rows", events=len(events)) as attrs:
+        df = expand_rows(pd.DataFrame(events, columns=EVENT_COLUMNS), EXPECTED_COLUMNS)
+        attrs["rows"] = len(df)
+
+    # Rows that are still invalid are returned for review but not cached
+    if use_cache and not stats["invalid_rows"]:
+        store_extraction(vectorstore, cache_key, dataframe_to_rows(df))
+    stats["seconds"] = time.perf_counter() - start
+    return df, stats
+
+def parse_response(response):
+    """
+    Parse the LLM answer into a DataFrame with the expected columns.
+
+    :param response: The message returned by the chain, or its text
+
+    :return: A pandas DataFrame with structured response
+    """
+    logger.debug("Tipe respons mentah: %s", type(response))
+    logger.debug("Konten respons mentah: %s", response)
 
-    # Extensive debugging
-    print("=" * 50)
-    print("DEBUG: Tipe Respons Mentah:", type(response))
-    print("DEBUG: Konten Respons Mentah:", response)
-    
     # Extract content robustly
     try:
         if hasattr(response, 'content'):
@@ -187,64 +1004,122 @@ def query_document(vectorstore, query):
         else:
             raw_text = str(response)
     except Exception as e:
-        print(f"Error saat mengekstrak konten: {e}")
-        return pd.DataFrame(columns=expected_columns)
+        logger.warning("Error saat mengekstrak konten: %s", e)
+        return pd.DataFrame(columns=EXPECTED_COLUMNS)
 
     # Clean the text
     cleaned_text = raw_text.replace("```json", "").replace("```", "").strip()
-    
-    print("DEBUG: Teks yang Dibersihkan:", cleaned_text)
-    print("=" * 50)
+
+    logger.debug("Teks yang dibersihkan: %s", cleaned_text)
 
     # Parsing attempts
-    try:
-        # Try parsing as a JSON array
-        if cleaned_text.startswith('[') and cleaned_text.endswith(']'):
-            try:
-                parsed_data = json.loads(cleaned_text)
-                df = pd.DataFrame(parsed_data)
-            except json.JSONDecodeError:
-                print("Gagal parsing sebagai array JSON")
-                df = pd.DataFrame()
-
-        # Try parsing as a single JSON object
-        elif cleaned_text.startswith('{') and cleaned_text.endswith('}'):
-            try:
-                parsed_data = json.loads(cleaned_text)
-                df = pd.DataFrame([parsed_data])
-            except json.JSONDecodeError:
-                print("Gagal parsing sebagai objek JSON")
-                df = pd.DataFrame()
+    with span("json_parse", characters=len(cleaned_text)) as attrs:
+        try:
+            # Try parsing as a JSON array
+            if cleaned_text.startswith('[') and cleaned_text.endswith(']'):
+                try:
+                    parsed_data = json.loads(cleaned_text)
+                    df = pd.DataFrame(parsed_data)
+                except json.JSONDecodeError:
+                    logger.warning("Gagal parsing sebagai array JSON")
+                    df = pd.DataFrame()
 
-        # Try extracting JSON objects
-        else:
-            # Use regex to find potential JSON objects
-            json_objects = re.findall(r'\{[^{}]+\}', cleaned_text)
-            results = []
-            
-            for obj in json_objects:
+            # Try parsing as a single JSON object
+            elif cleaned_text.startswith('{') and cleaned_text.endswith('}'):
                 try:
-                    parsed_obj = json.loads(obj)
-                    results.append(parsed_obj)
+                    parsed_data = json.loads(cleaned_text)
+                    df = pd.DataFrame([parsed_data])
                 except json.JSONDecodeError:
-                    continue
-            
-            df = pd.DataFrame(results) if results else pd.DataFrame()
+                    logger.warning("Gagal parsing sebagai objek JSON")
+                    df = pd.DataFrame()
 
-        # Enforce schema
-        if df.empty:
-            df = pd.DataFrame(columns=expected_columns)
-        else:
-            # Ensure all expected columns exist
-            for col in expected_columns:
-                if col not in df.columns:
-                    df[col] = None
+            # Try extracting JSON objects
+            else:
+                # Scan for brace-balanced JSON objects, braces inside strings included
+                results = iter_json_objects(cleaned_text)
+                df = pd.DataFrame(results) if results else pd.DataFrame()
 
-            # Reorder columns
-            df = df.reindex(columns=expected_columns)
+            # Enforce schema
+            if df.empty:
+                df = pd.DataFrame(columns=EXPECTED_COLUMNS)
+            else:
+                # One row per event day, with HARI derived from TANGGAL and the columns in order
+                df = expand_rows(df, EXPECTED_COLUMNS)
 
-    except Exception as e:
-        print(f"Error Parsing Akhir: {e}")
-        df = pd.DataFrame(columns=expected_columns)
+        except Exception as e:
+            logger.warning("Error parsing akhir: %s", e)
+            df = pd.DataFrame(columns=EXPECTED_COLUMNS)
+        attrs["rows"] = len(df)
+
+    return df
+
+async def extract_batch(uploaded_files, query=EXTRACTION_QUERY, max_concurrency=4, model=CHAT_MODEL, progress_callback=None):
+    """
+    Ingest and extract several PDFs concurrently.
+
+    Each file is ingested on a worker thread and queried with ainvoke, with
+    at most max_concurrency files in flight. A failing file is recorded and
+    does not stop the others.
+
+    :param uploaded_files: A list of file-like objects with the PDF content and a name
+    :param query: The question to ask each document
+    :param max_concurrency: Maximum number of files processed at the same time
+    :param model: Name of the chat model
+    :param progress_callback: Optional callable(done, total, file_name, error) called after each file
+
+    :return: A (DataFrame, stats) tuple; the DataFrame has a SOURCE_FILE column
+        and stats holds counts, errors, elapsed seconds and letters per minute
+    """
+    from langchain_openai import ChatOpenAI
+    semaphore = asyncio.Semaphore(max_concurrency)
+    # The async client is tied to this event loop, so it is not shared across runs
+    async_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=max_concurrency * 2, max_keepalive_connections=max_concurrency),
+        timeout=httpx.Timeout(60.0, connect=10.0)
+    )
+    llm = ChatOpenAI(model=model, api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, http_async_client=async_client)
+    # Files are ingested concurrently, so they split the cores between their OCR pools
+    ocr_workers = max(1, available_cores() // max_concurrency)
+    total = len(uploaded_files)
+    results = [None] * total
+    errors = []
+    done = 0
+
+    async def process(index, uploaded_file):
+        nonlocal done
+        async with semaphore:
+            error = None
+            try:
+                vectorstore = await asyncio.to_thread(ingest_pdf, uploaded_file, ocr_workers=ocr_workers)
+                df = await aquery_document(vectorstore, query, model, llm=llm)
+                df.insert(0, "SOURCE_FILE", uploaded_file.name)
+                results[index] = df
+            except Exception as e:
+                error = e
+                errors.append({"SOURCE_FILE": uploaded_file.name, "ERROR": str(e)})
+            done += 1
+            if progress_callback is not None:
+                progress_callback(done, total, uploaded_file.name, error)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(process(i, f) for i, f in enumerate(uploaded_files)))
+    finally:
+        await async_client.aclose()
+    elapsed = time.perf_counter() - start
+
+    frames = [df for df in results if df is not None]
+    if frames:
+        combined = pd.concat(frames, ignore_index=True)
+    else:
+        combined = pd.DataFrame(columns=["SOURCE_FILE", *EXPECTED_COLUMNS])
 
-    return df
\ No newline at end of file
+    stats = {
+        "files": total,
+        "succeeded": len(frames),
+        "failed": len(errors),
+        "errors": errors,
+        "seconds": elapsed,
+        "letters_per_minute": len(frames) / elapsed * 60 if elapsed else 0.0,
+    }
+    return combined, stats
@@ -0,0 +1,63 @@
+import json
+
+
+class JSONObjectStream:
+    """
+    Incremental parser that yields top-level JSON objects from streamed text.
+
+    Text is fed in arbitrary pieces; every time a brace-balanced object
+    completes it is decoded and returned. Surrounding array brackets,
+    commas, markdown fences and prose are skipped, and braces inside
+    strings are ignored.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text):
+        """
+        Consume a piece of text.
+
+        :param text: The next piece of the streamed response
+
+        :return: A list of the objects completed by this piece
+        """
+        objects = []
+        for char in text:
+            if self._depth == 0:
+                if char == "{":
+                    self._buffer = [char]
+                    self._depth = 1
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        objects.append(json.loads("".join(self._buffer)))
+                    except json.JSONDecodeError:
+                        pass
+                    self._buffer = []
+        return objects
+
+
+def iter_json_objects(text):
+    """
+    Return every top-level JSON object found in a complete piece of text.
+    """
+    return JSONObjectStream().feed(text)
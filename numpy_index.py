@@ -0,0 +1,129 @@
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class NumpyVectorIndex:
+    """
+    Exact cosine search over a contiguous float32 matrix of unit-length embeddings.
+    """
+
+    def __init__(self, documents, embeddings):
+        self.documents = list(documents)
+        if not self.documents:
+            # An empty collection, e.g. a scan whose OCR found no text; searches return nothing
+            self.matrix = np.empty((0, 0), dtype=np.float32)
+            return
+        matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(self.documents), -1)
+        self.matrix = np.ascontiguousarray(_normalize(matrix))
+
+    def __len__(self):
+        return len(self.documents)
+
+    def _query_vector(self, query_embedding):
+        return _normalize(np.asarray(query_embedding, dtype=np.float32))
+
+    def top_k(self, query_embedding, k=4):
+        """
+        Return the indices and cosine scores of the k most similar documents, best first.
+        """
+        if not len(self.documents):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = self.matrix @ self._query_vector(query_embedding)
+        k = min(k, len(scores))
+        # argpartition finds the top k in linear time; only those k get sorted
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        order = candidates[np.argsort(-scores[candidates])]
+        return order, scores[order]
+
+    def similarity_search(self, query_embedding, k=4):
+        indices, _ = self.top_k(query_embedding, k)
+        return [self.documents[i] for i in indices]
+
+    def max_marginal_relevance_search(self, query_embedding, k=4, fetch_k=20, lambda_mult=0.5):
+        """
+        Pick k documents out of the fetch_k most similar, trading relevance for diversity.
+
+        :param lambda_mult: 1 ranks by relevance only, 0 by diversity only
+        """
+        candidates, relevance = self.top_k(query_embedding, max(k, fetch_k))
+        if not len(candidates):
+            return []
+        vectors = self.matrix[candidates]
+        # Similarity of every candidate to the closest already selected one
+        redundancy = np.full(len(candidates), -np.inf, dtype=np.float32)
+        selected = []
+        available = np.ones(len(candidates), dtype=bool)
+        for _ in range(min(k, len(candidates))):
+            if selected:
+                redundancy = np.maximum(redundancy, vectors @ vectors[selected[-1]])
+                scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+            else:
+                scores = relevance.copy()
+            scores[~available] = -np.inf
+            best = int(np.argmax(scores))
+            selected.append(best)
+            available[best] = False
+        return [self.documents[candidates[i]] for i in selected]
+
+
+class NumpyRetriever(BaseRetriever):
+    """
+    Retriever over a NumpyVectorIndex, embedding the query with the collection's embedding function.
+    """
+    index: NumpyVectorIndex
+    embedding_function: object
+    search_type: str = "similarity"
+    k: int = 4
+    fetch_k: int = 20
+    lambda_mult: float = 0.5
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        query_embedding = self.embedding_function.embed_query(query)
+        if self.search_type == "mmr":
+            return self.index.max_marginal_relevance_search(
+                query_embedding, k=self.k, fetch_k=self.fetch_k, lambda_mult=self.lambda_mult
+            )
+        return self.index.similarity_search(query_embedding, k=self.k)
+
+
+class NumpyVectorStore:
+    """
+    In-memory stand-in for a small Chroma collection.
+
+    The collection stays the persistent copy; this only replaces its
+    SQLite + HNSW query path with one matrix product.
+    """
+
+    def __init__(self, index, embedding_function, document_hash=None):
+        self.index = index
+        self.embedding_function = embedding_function
+        self.document_hash = document_hash
+
+    @classmethod
+    def from_collection(cls, collection, embedding_function, document_hash=None):
+        """
+        Load every chunk and its embedding from a chromadb Collection.
+        """
+        stored = collection.get(include=["documents", "metadatas", "embeddings"])
+        documents = [
+            Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(stored["documents"], stored["metadatas"])
+        ]
+        return cls(NumpyVectorIndex(documents, stored["embeddings"]), embedding_function, document_hash)
+
+    def as_retriever(self, search_type="similarity", search_kwargs=None, **kwargs):
+        return NumpyRetriever(
+            index=self.index,
+            embedding_function=self.embedding_function,
+            search_type=search_type,
+            **(search_kwargs or {})
+        )
@@ -0,0 +1,170 @@
+import io
+import os
+import sqlite3
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from tracing import logger
+
+OCR_LANG = os.getenv("OCR_LANG", "ind+eng")
+# 300 dpi relative to PDF's 72 dpi user space
+OCR_ZOOM = 300 / 72
+# Pages with less extracted text than this are treated as scans
+MIN_TEXT_CHARS = 20
+# Rendered pages queued per OCR worker; bounds the page images held in memory
+OCR_PAGES_IN_FLIGHT_PER_WORKER = 2
+
+
+def _ocr_image(image_bytes, lang):
+    # Runs in a worker process, so the heavy imports stay out of the parent
+    import pytesseract
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        return pytesseract.image_to_string(image, lang=lang)
+
+
+class OCRCache:
+    """
+    Persistent OCR results keyed by (sha256 of the page image, language).
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ocr_results (
+                image_hash TEXT NOT NULL,
+                lang TEXT NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (image_hash, lang)
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, image_hash, lang):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM ocr_results WHERE image_hash = ? AND lang = ?",
+                (image_hash, lang)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, image_hash, lang, text):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_results (image_hash, lang, text) VALUES (?, ?, ?)",
+                (image_hash, lang, text)
+            )
+            self._conn.commit()
+
+
+def find_pages_without_text(documents, min_chars=MIN_TEXT_CHARS):
+    """
+    Return the indices of page documents that have no usable text layer.
+    """
+    return [
+        index for index, doc in enumerate(documents)
+        if len(doc.page_content.strip()) < min_chars
+    ]
+
+
+def available_cores():
+    """
+    Return the number of cores this process may run on.
+
+    Inside a container os.cpu_count() reports the host's cores, while the
+    affinity mask reflects the CPUs actually assigned to the process.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def _get_mp_context():
+    # forkserver avoids forking a multi-threaded Streamlit/uvicorn process
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context()
+
+
+def apply_ocr(pdf, documents, cache=None, lang=OCR_LANG, max_workers=None):
+    """
+    OCR the pages without a text layer and merge the result into their documents.
+
+    Only the scanned pages are rasterised, one at a time as the pool has
+    room for them. Tesseract runs on a process pool sized to the available
+    cores, and results are cached by page image hash.
+
+    :param pdf: The PDFDocument the documents were loaded from
+    :param documents: A list of per-page Document objects from PDFDocument.load
+    :param cache: An optional OCRCache
+    :param lang: Tesseract language(s)
+    :param max_workers: Size of the process pool, defaults to the number of available cores
+
+    :return: The list of documents, with OCR text on scanned pages
+    """
+    indices = find_pages_without_text(documents)
+    if not indices:
+        return documents
+
+    texts = {}
+    # Text of every image OCR'd in this call, so identical scans (e.g. a repeated
+    # attachment page) are OCR'd once
+    results = {}
+    # image hash -> (future, indices of the pages showing that image)
+    pending = {}
+    workers = min(len(indices), max_workers or available_cores())
+    executor = None
+
+    def collect(image_hash):
+        future, page_indices = pending.pop(image_hash)
+        try:
+            results[image_hash] = future.result()
+        except Exception as e:
+            # The pages keep their text layer, and the failure is not cached so a later run retries it
+            logger.warning("OCR halaman %s gagal: %s", ", ".join(str(index + 1) for index in page_indices), e)
+            return
+        if cache is not None:
+            cache.put(image_hash, lang, results[image_hash])
+        for page_index in page_indices:
+            texts[page_index] = results[image_hash]
+
+    try:
+        for index in indices:
+            # The next page is rendered only when the pool has room for it, so at most a
+            # few 300-dpi images are held at once
+            while len(pending) >= workers * OCR_PAGES_IN_FLIGHT_PER_WORKER:
+                done, _ = wait([future for future, _ in pending.values()], return_when=FIRST_COMPLETED)
+                for image_hash in [key for key, (future, _) in pending.items() if future in done]:
+                    collect(image_hash)
+            image = pdf.render_page(documents[index].metadata["page"], zoom=OCR_ZOOM, fmt="png")
+            image_hash = hashlib.sha256(image).hexdigest()
+            if image_hash in pending:
+                pending[image_hash][1].append(index)
+                continue
+            text = results.get(image_hash)
+            if text is None and cache is not None:
+                text = cache.get(image_hash, lang)
+            if text is not None:
+                texts[index] = text
+                continue
+            if executor is None:
+                executor = ProcessPoolExecutor(max_workers=workers, mp_context=_get_mp_context())
+            pending[image_hash] = (executor.submit(_ocr_image, image, lang), [index])
+        for image_hash in list(pending):
+            collect(image_hash)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    for index, text in texts.items():
+        documents[index].page_content = text
+        documents[index].metadata["ocr"] = True
+    return documents
@@ -0,0 +1,123 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+PREVIEW_ZOOM = 2.0
+THUMBNAIL_ZOOM = 0.25
+
+
+class PageRenderCache:
+    """
+    Memory-bounded LRU cache of rendered PDF pages.
+
+    Entries are keyed by (document hash, page number, zoom, format, quality)
+    and evicted least recently used first once their encoded size exceeds
+    max_bytes. After each request the neighbouring pages are rendered on a
+    single background thread so page flips hit the cache.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, fmt="jpeg", quality=80, prefetch=True):
+        self.max_bytes = max_bytes
+        self.fmt = fmt
+        self.quality = quality
+        self.prefetch_enabled = prefetch
+        self.hits = 0
+        self.misses = 0
+        self._images = OrderedDict()
+        self._size = 0
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-prefetch")
+
+    def _key(self, pdf, page_number, zoom):
+        return (pdf.content_hash, page_number, zoom, self.fmt, self.quality)
+
+    def _lookup(self, key):
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+            return image
+
+    def _store(self, key, image):
+        with self._lock:
+            if key in self._images:
+                return
+            self._images[key] = image
+            self._size += len(image)
+            while self._size > self.max_bytes and len(self._images) > 1:
+                _, evicted = self._images.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _render(self, pdf, page_number, zoom):
+        key = self._key(pdf, page_number, zoom)
+        image = self._lookup(key)
+        if image is None:
+            image = pdf.render_page(page_number, zoom=zoom, fmt=self.fmt, quality=self.quality)
+            self._store(key, image)
+        return image
+
+    def get(self, pdf, page_number, zoom=PREVIEW_ZOOM):
+        """
+        Return the encoded image of a page, rendering it on a miss.
+
+        :param pdf: A PDFDocument
+        :param page_number: Zero-based page index
+        :param zoom: Scale factor relative to 72 dpi
+
+        :return: The encoded image bytes
+        """
+        key = self._key(pdf, page_number, zoom)
+        image = self._lookup(key)
+        with self._lock:
+            if image is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if image is None:
+            image = self._render(pdf, page_number, zoom)
+        if self.prefetch_enabled:
+            self.prefetch(pdf, [page_number - 1, page_number + 1], zoom)
+        return image
+
+    def prefetch(self, pdf, page_numbers, zoom=PREVIEW_ZOOM):
+        """
+        Render pages in the background if they are not cached yet.
+        """
+        for page_number in page_numbers:
+            if not 0 <= page_number < pdf.page_count:
+                continue
+            key = self._key(pdf, page_number, zoom)
+            with self._lock:
+                if key in self._images or key in self._pending:
+                    continue
+                self._pending.add(key)
+            self._executor.submit(self._prefetch_one, pdf, page_number, zoom, key)
+
+    def _prefetch_one(self, pdf, page_number, zoom, key):
+        try:
+            self._render(pdf, page_number, zoom)
+        except Exception:
+            # The document may have been closed by a new upload in the meantime
+            pass
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def thumbnails(self, pdf, page_numbers, zoom=THUMBNAIL_ZOOM):
+        """
+        Return low-resolution images of several pages.
+
+        :return: A list of (page_number, image bytes) tuples
+        """
+        return [(page_number, self._render(pdf, page_number, zoom)) for page_number in page_numbers]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._images),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,159 @@
+import io
+import hashlib
+import threading
+import fitz  # PyMuPDF
+from PIL import Image
+from langchain_core.documents import Document
+
+
+def _mostly_inside(rect, containers):
+    # A text block belongs to a table if at least half of it lies within the table
+    area = rect.get_area()
+    return any(
+        container.intersects(rect) and (container & rect).get_area() >= 0.5 * area
+        for container in containers
+    )
+
+
+class PDFDocument:
+    """
+    A PDF opened once with PyMuPDF, from bytes or from a file on disk.
+
+    The same handle serves text extraction for ingestion and page rendering
+    for the preview pane. PyMuPDF documents are not thread-safe, so every
+    access goes through self.lock.
+    """
+
+    def __init__(self, data=None, name="document.pdf", path=None, content_hash=None):
+        self.name = name
+        self.path = path
+        self.lock = threading.RLock()
+        if path is not None:
+            # MuPDF reads the file on demand instead of holding a copy of it
+            self.content_hash = content_hash
+            self.doc = fitz.open(path, filetype="pdf")
+        else:
+            self.content_hash = content_hash or hashlib.sha256(data).hexdigest()
+            self.doc = fitz.open(stream=data, filetype="pdf")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.page_count
+
+    @property
+    def page_count(self):
+        return self.doc.page_count
+
+    def load(self):
+        """
+        Extract the text of every page.
+
+        :return: A list of Document objects, one per page
+        """
+        documents = []
+        with self.lock:
+            total_pages = self.doc.page_count
+            for page in self.doc:
+                documents.append(Document(
+                    page_content=page.get_text("text"),
+                    metadata={
+                        "source": self.name,
+                        "page": page.number,
+                        "total_pages": total_pages,
+                    }
+                ))
+        return documents
+
+    def load_blocks(self):
+        """
+        Extract the layout blocks of every page in reading order.
+
+        Tables found by PyMuPDF are returned as one block each, with cells
+        joined by " | ", and the text blocks inside them are dropped, so a
+        table never straddles two blocks. Image blocks are skipped.
+
+        :return: A list of Document objects, one per block, with page and kind metadata
+        """
+        blocks = []
+        with self.lock:
+            for page in self.doc:
+                page_blocks = []
+                table_rects = []
+                try:
+                    tables = page.find_tables().tables
+                except Exception:
+                    tables = []
+                for table in tables:
+                    rect = fitz.Rect(table.bbox)
+                    table_rects.append(rect)
+                    rows = [
+                        " | ".join(cell.strip() if cell else "" for cell in row)
+                        for row in table.extract()
+                    ]
+                    page_blocks.append((rect.y0, rect.x0, "table", "\n".join(rows)))
+
+                for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks"):
+                    if block_type != 0 or not text.strip():
+                        continue
+                    rect = fitz.Rect(x0, y0, x1, y1)
+                    if _mostly_inside(rect, table_rects):
+                        continue
+                    page_blocks.append((y0, x0, "text", text.strip()))
+
+                page_blocks.sort(key=lambda block: (round(block[0], 1), block[1]))
+                for _, _, kind, text in page_blocks:
+                    blocks.append(Document(
+                        page_content=text,
+                        metadata={"source": self.name, "page": page.number, "kind": kind}
+                    ))
+        return blocks
+
+    def render_page(self, page_number, zoom=2.0, fmt="png", quality=85):
+        """
+        Rasterise a page.
+
+        :param page_number: Zero-based page index
+        :param zoom: Scale factor relative to 72 dpi
+        :param fmt: Output format, "png", "jpeg" or "webp"
+        :param quality: JPEG/WebP quality, ignored for PNG
+
+        :return: The encoded image bytes
+        """
+        with self.lock:
+            pix = self.doc[page_number].get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        if fmt == "jpeg":
+            return pix.tobytes("jpeg", jpg_quality=quality)
+        if fmt == "webp":
+            image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+            buffer = io.BytesIO()
+            image.save(buffer, format="WEBP", quality=quality)
+            return buffer.getvalue()
+        return pix.tobytes(fmt)
+
+    def close(self):
+        with self.lock:
+            if not self.doc.is_closed:
+                self.doc.close()
+
+
+def open_pdf(uploaded_file):
+    """
+    Open an uploaded file as a PDFDocument.
+
+    A SpooledUpload is opened from its file on disk; any other file-like
+    object is read into memory.
+
+    :param uploaded_file: A SpooledUpload, or a file-like object with the PDF content and a name
+
+    :return: A PDFDocument
+    """
+    if getattr(uploaded_file, "path", None) is not None:
+        return PDFDocument(
+            name=uploaded_file.name, path=uploaded_file.path, content_hash=uploaded_file.content_hash
+        )
+    return PDFDocument(uploaded_file.getvalue(), name=uploaded_file.name)
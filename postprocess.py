@@ -0,0 +1,159 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+DAY_NAMES = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu", "Minggu"]
+# Output format of TANGGAL, the one used by the Excel template
+DATE_FORMAT = "%d %B %Y"
+# A range longer than this is treated as a misread date rather than expanded
+MAX_EVENT_DAYS = int(os.getenv("MAX_EVENT_DAYS", "31"))
+
+_ID_MONTHS = {
+    "januari": "January", "februari": "February", "pebruari": "February", "maret": "March",
+    "april": "April", "mei": "May", "juni": "June", "juli": "July", "agustus": "August",
+    "september": "September", "oktober": "October", "nopember": "November", "november": "November",
+    "desember": "December",
+}
+_ID_MONTH_PATTERN = re.compile(r"\b(" + "|".join(_ID_MONTHS) + r")\b", re.IGNORECASE)
+# A leading day name such as "Senin, " or "Senin s.d. Rabu, "
+_DAY_PREFIX_PATTERN = r"^\s*(?:[A-Za-z']+\s*(?:(?:-|–|s\.?\s?d\.?|sampai(?:\s+dengan)?|hingga)\s*[A-Za-z']+)?\s*,\s*)"
+_RANGE_PATTERN = re.compile(
+    r"^(?P<d1>\d{1,2})(?:\s+(?P<m1>[A-Za-z]+))?(?:\s+(?P<y1>\d{4}))?"
+    r"\s*(?:-|–|s\.?\s?d\.?|sampai(?:\s+dengan)?|hingga)\s*"
+    r"(?P<d2>\d{1,2})\s+(?P<m2>[A-Za-z]+)\s+(?P<y2>\d{4})$",
+    re.IGNORECASE
+)
+
+
+def _clean(values):
+    # Indonesian month names become English ones, so one format string parses both
+    text = pd.Series(values, dtype="object").fillna("").astype(str)
+    text = text.str.replace(_DAY_PREFIX_PATTERN, "", regex=True).str.strip()
+    return text.str.replace(_ID_MONTH_PATTERN, lambda match: _ID_MONTHS[match.group(1).lower()], regex=True)
+
+
+def parse_dates(values):
+    """
+    Parse a column of dates written in any of the formats seen in letters and templates.
+
+    "02 January 2025" and "2 Januari 2025" are parsed in one vectorized pass,
+    then ISO dates and datetimes in a second one; only what is left, such as
+    "02/01/2025", falls back to day-first mixed parsing.
+
+    :param values: A Series or list of strings, datetimes or None
+
+    :return: A datetime64 Series, NaT where a value is not a date
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.normalize()
+    text = _clean(values)
+    dates = pd.to_datetime(text, format=DATE_FORMAT, errors="coerce")
+    for fallback in ({"format": "ISO8601"}, {"format": "mixed", "dayfirst": True}):
+        rest = dates.isna() & text.ne("")
+        if not rest.any():
+            break
+        dates[rest] = pd.to_datetime(text[rest], errors="coerce", **fallback)
+    return dates.dt.normalize()
+
+
+def format_dates(dates):
+    """
+    Format a datetime64 Series as TANGGAL strings, with "" for NaT.
+    """
+    return dates.dt.strftime(DATE_FORMAT).fillna("")
+
+
+def normalize_dates(values):
+    """
+    Rewrite a column of dates in the TANGGAL format, leaving values that are not dates unchanged.
+    """
+    values = pd.Series(values)
+    dates = parse_dates(values)
+    return format_dates(dates).where(dates.notna(), values)
+
+
+def day_names(dates):
+    """
+    Return the Indonesian day name of every date in a datetime64 Series, with "" for NaT.
+    """
+    names = pd.Series(np.asarray(DAY_NAMES, dtype=object)[dates.dt.weekday.fillna(0).astype(int)], index=dates.index)
+    return names.where(dates.notna(), "")
+
+
+def split_ranges(values):
+    """
+    Split date ranges written in one cell, e.g. "02 - 04 January 2025" or "02 Januari s.d. 04 Januari 2025".
+
+    :param values: A Series of strings
+
+    :return: A (start, end) tuple of datetime64 Series; end is NaT for single dates
+    """
+    text = _clean(values)
+    # String dtype keeps fillna on the all-missing groups from downcasting object columns
+    parts = text.str.extract(_RANGE_PATTERN).astype("string")
+    is_range = parts["d1"].notna()
+    # The first date borrows the month and year it leaves out from the second
+    start_text = (
+        parts["d1"] + " " + parts["m1"].combine_first(parts["m2"]) + " " + parts["y1"].combine_first(parts["y2"])
+    ).where(is_range, text)
+    end_text = (parts["d2"] + " " + parts["m2"] + " " + parts["y2"]).where(is_range, "")
+    return parse_dates(start_text), parse_dates(end_text)
+
+
+def expand_rows(df, columns=None):
+    """
+    Turn compact event rows into one row per day.
+
+    An event spans TANGGAL to TANGGAL_SELESAI, or a range written in
+    TANGGAL itself. Rows are repeated by their number of days and the dates
+    are built with one vectorized offset, so no per-row date_range is
+    needed. TANGGAL is rewritten in DATE_FORMAT and HARI is derived from it;
+    rows whose date cannot be parsed are kept as they are.
+
+    :param df: A DataFrame of extracted rows
+    :param columns: Columns of the result, every column of df except TANGGAL_SELESAI when omitted
+
+    :return: A new DataFrame with one row per event day
+    """
+    if columns is None:
+        columns = [col for col in df.columns if col != "TANGGAL_SELESAI"]
+    if df.empty or "TANGGAL" not in df.columns:
+        return df.reindex(columns=columns).reset_index(drop=True)
+
+    df = df.reset_index(drop=True)
+    start, range_end = split_ranges(df["TANGGAL"])
+    if "TANGGAL_SELESAI" in df.columns:
+        end = parse_dates(df["TANGGAL_SELESAI"]).fillna(range_end)
+    else:
+        end = range_end
+    end = end.fillna(start)
+    # Dates written backwards are swapped rather than dropped. A row whose TANGGAL does not
+    # parse keeps NaT as its start and is left unexpanded, whatever TANGGAL_SELESAI says
+    backwards = start.notna() & end.notna() & (start > end)
+    start, end = start.where(~backwards, end), end.where(~backwards, start)
+
+    days = ((end - start).dt.days + 1).fillna(1).astype(int)
+    days = days.where(days.between(1, MAX_EVENT_DAYS), 1)
+    repeat = np.repeat(df.index.to_numpy(), days.to_numpy())
+    expanded = df.loc[repeat].reset_index(drop=True)
+    offsets = expanded.groupby(repeat).cumcount().to_numpy()
+    dates = (start.loc[repeat].reset_index(drop=True) + pd.to_timedelta(offsets, unit="D"))
+
+    parsed = dates.notna()
+    expanded["TANGGAL"] = format_dates(dates).where(parsed, expanded["TANGGAL"])
+    hari = expanded["HARI"] if "HARI" in expanded.columns else pd.Series("", index=expanded.index)
+    expanded["HARI"] = day_names(dates).where(parsed, hari)
+    return expanded.reindex(columns=columns)
+
+
+def expand_row(row, columns=None):
+    """
+    Expand one compact row dict, as yielded while streaming, into per-day row dicts.
+    """
+    if columns is None:
+        columns = [col for col in row if col != "TANGGAL_SELESAI"]
+    df = expand_rows(pd.DataFrame([row]), columns)
+    return df.astype(object).where(df.notna(), None).to_dict("records")
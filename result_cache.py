@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+def make_result_key(document_hash, prompt, query, model, ingestion_key):
+    """
+    Build the cache key of an extraction from its inputs.
+
+    :param document_hash: Content hash of the PDF
+    :param prompt: The prompt template string
+    :param query: The question asked
+    :param model: Name of the chat model
+    :param ingestion_key: Key of the chunking and embedding setup, which decides the context the model sees
+
+    :return: A hex digest
+    """
+    parts = json.dumps({
+        "document": document_hash,
+        "prompt": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+        "query": hashlib.sha256(query.encode("utf-8")).hexdigest(),
+        "model": model,
+        "ingestion": ingestion_key,
+    }, sort_keys=True)
+    return hashlib.sha256(parts.encode("utf-8")).hexdigest()
+
+
+class ExtractionResultCache:
+    """
+    Persistent cache of parsed extraction rows.
+
+    Entries expire after ttl_seconds, and the least recently used entries
+    are evicted once the stored rows exceed max_bytes.
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_bytes=64 * 1024 * 1024):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                document_hash TEXT NOT NULL,
+                rows TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_document ON results (document_hash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_last_access ON results (last_access)")
+        self._conn.commit()
+
+    def get(self, key):
+        """
+        Return the cached rows of a key, or None if missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT rows, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, document_hash, rows):
+        """
+        Store the rows of a key and evict expired or least recently used entries.
+
+        :param key: A key from make_result_key
+        :param document_hash: Content hash of the PDF, used by invalidate
+        :param rows: A list of JSON-serialisable dicts
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, document_hash, rows, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, document_hash, json.dumps(rows), now, now)
+            )
+            self._conn.commit()
+            self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,))
+        size = self._conn.execute("SELECT COALESCE(SUM(LENGTH(rows)), 0) FROM results").fetchone()[0]
+        if size > self.max_bytes:
+            victims = []
+            for key, length in self._conn.execute(
+                "SELECT key, LENGTH(rows) FROM results ORDER BY last_access"
+            ):
+                victims.append((key,))
+                size -= length
+                if size <= self.max_bytes:
+                    break
+            self._conn.executemany("DELETE FROM results WHERE key = ?", victims)
+        self._conn.commit()
+
+    def invalidate(self, document_hash=None):
+        """
+        Drop the cached results of one document, or of every document.
+
+        :return: The number of entries removed
+        """
+        with self._lock:
+            if document_hash is None:
+                cursor = self._conn.execute("DELETE FROM results")
+            else:
+                cursor = self._conn.execute("DELETE FROM results WHERE document_hash = ?", (document_hash,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(rows)), 0) FROM results"
+            ).fetchone()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": entries,
+                "size_bytes": size,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,28 @@
+import sys
+import sqlite3
+
+# Chroma refuses to start on SQLite older than this
+CHROMA_MIN_SQLITE = (3, 35, 0)
+
+
+def use_modern_sqlite():
+    """
+    Make sure Chroma sees a recent enough SQLite.
+
+    The system sqlite3 is kept when it is new enough; otherwise pysqlite3
+    (pysqlite3-binary) is swapped in. Call this before chromadb is imported.
+
+    :return: The SQLite version Chroma will use, as a string
+    """
+    sqlite_module = sys.modules["sqlite3"]
+    if sqlite_module.sqlite_version_info >= CHROMA_MIN_SQLITE:
+        return sqlite_module.sqlite_version
+    try:
+        import pysqlite3
+    except ImportError:
+        raise RuntimeError(
+            f"Chroma membutuhkan SQLite >= {'.'.join(map(str, CHROMA_MIN_SQLITE))}, "
+            f"tersedia {sqlite3.sqlite_version}. Pasang pysqlite3-binary."
+        )
+    sys.modules["sqlite3"] = pysqlite3
+    return pysqlite3.sqlite_version
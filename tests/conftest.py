@@ -0,0 +1,9 @@
+"""
+The modules live at the repository root, as app.py and api.py import them.
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,117 @@
+import asyncio
+import functools
+
+from fastapi.testclient import TestClient
+
+import api
+import uploads
+from api import ExtractionService, Job, ServiceBusy
+
+PDF_BODY = b"%PDF-1.4\n%%EOF\n"
+
+
+def test_duplicate_inflight_jobs_share_one_run():
+    async def scenario():
+        service = ExtractionService(workers=2, queue_size=4)
+        await service.start()
+        release = asyncio.Event()
+        runs = []
+
+        async def ingest(job):
+            runs.append(job.key)
+            job.push({"page": 1})
+            await release.wait()
+            job.push({"page": 2})
+            return {"status": "ready"}
+
+        try:
+            first = service.submit(("ingest", "a" * 64), ingest)
+            second = service.submit(("ingest", "a" * 64), ingest)
+            assert second is first
+            rows = [[], []]
+
+            async def subscribe(index):
+                async for row in first.iter_rows():
+                    rows[index].append(row)
+
+            subscribers = [asyncio.create_task(subscribe(index)) for index in range(2)]
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(first.wait(), second.wait(), *subscribers)
+        finally:
+            await service.stop()
+        assert results[:2] == [{"status": "ready"}, {"status": "ready"}]
+        assert rows == [[{"page": 1}, {"page": 2}]] * 2
+        assert runs == [("ingest", "a" * 64)]
+        assert service.stats["submitted"] == 1
+        assert service.stats["deduplicated"] == 1
+        assert not service.inflight
+
+    asyncio.run(scenario())
+
+
+def test_job_errors_reach_every_waiter():
+    async def scenario():
+        job = Job(("extract", "a" * 64, "model"), None)
+        job.finish(error=ValueError("gagal"))
+        for _ in range(2):
+            try:
+                await job.wait()
+            except ValueError as e:
+                assert str(e) == "gagal"
+            else:
+                raise AssertionError("wait did not raise")
+
+    asyncio.run(scenario())
+
+
+def test_submit_raises_service_busy_when_the_queue_is_full():
+    async def scenario():
+        service = ExtractionService(workers=0, queue_size=1)
+        await service.start()
+        try:
+            service.submit(("ingest", "a" * 64), None)
+            try:
+                service.submit(("ingest", "b" * 64), None)
+            except ServiceBusy:
+                pass
+            else:
+                raise AssertionError("submit did not raise ServiceBusy")
+            # An identical job in flight is joined even when the queue is full
+            assert service.submit(("ingest", "a" * 64), None).key == ("ingest", "a" * 64)
+        finally:
+            await service.stop()
+        assert service.stats["rejected"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_upload_answers_503_with_retry_after_when_the_queue_is_full(tmp_path, monkeypatch):
+    service = ExtractionService(workers=0, queue_size=1)
+    monkeypatch.setattr(api, "service", service)
+    monkeypatch.setattr(api, "aspool_stream", functools.partial(uploads.aspool_stream, directory=str(tmp_path)))
+    with TestClient(api.app) as client:
+        client.portal.call(service.submit, ("ingest", "f" * 64), None)
+        response = client.post("/documents?filename=surat.pdf", content=PDF_BODY)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(api.RETRY_AFTER_SECONDS)
+    assert service.stats["rejected"] == 1
+
+
+def test_upload_rejects_bodies_that_are_not_pdf(tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "service", ExtractionService(workers=0, queue_size=1))
+    monkeypatch.setattr(api, "aspool_stream", functools.partial(uploads.aspool_stream, directory=str(tmp_path)))
+    with TestClient(api.app) as client:
+        response = client.post("/documents", content=b"bukan pdf")
+    assert response.status_code == 415
+
+
+def test_malformed_document_hashes_are_not_found(tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "service", ExtractionService(workers=0, queue_size=1))
+    looked_up = []
+    monkeypatch.setattr(api, "find_spooled", lambda *args, **kwargs: looked_up.append(args))
+    with TestClient(api.app) as client:
+        for document_hash in ("..%2F..%2Fetc%2Fpasswd", "A" * 64, "a" * 63, "a" * 64 + "%0A"):
+            assert client.get(f"/documents/{document_hash}/file").status_code == 404
+            assert client.post(f"/documents/{document_hash}/extract").status_code == 404
+    assert looked_up == []
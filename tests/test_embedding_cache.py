@@ -0,0 +1,72 @@
+import numpy as np
+
+import embedding_cache
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+
+MODEL = "text-embedding-3-small"
+DIMENSIONS = 4
+VECTOR_BYTES = DIMENSIONS * 4
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 0.5, -0.25, 0.1] for text in texts]
+
+
+def make_cache(tmp_path, monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(embedding_cache.time, "time", clock)
+    return EmbeddingCache(str(tmp_path / "embeddings.sqlite"), **kwargs), clock
+
+
+def test_vectors_round_trip_as_float32(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch)
+    vector = [0.1, -2.5, 3.0000001, 1e-8]
+    cache.put_many(MODEL, ["teks"], [vector])
+    stored, missing = cache.get_many(MODEL, ["teks", "lain"])
+    assert stored.dtype == np.float32
+    np.testing.assert_array_equal(stored, np.asarray(vector, dtype=np.float32))
+    assert missing is None
+    # Vectors of another model are separate entries
+    assert cache.get_many("other-model", ["teks"]) == [None]
+
+
+def test_least_recently_used_vectors_are_evicted_at_the_byte_cap(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, max_bytes=VECTOR_BYTES * 2)
+    vector = [0.0] * DIMENSIONS
+    cache.put_many(MODEL, ["satu"], [vector])
+    clock.now += 1
+    cache.put_many(MODEL, ["dua"], [vector])
+    clock.now += 1
+    # Reading "satu" makes "dua" the least recently used
+    assert cache.get_many(MODEL, ["satu"])[0] is not None
+    clock.now += 1
+    cache.put_many(MODEL, ["tiga"], [vector])
+    assert cache.size_bytes() == VECTOR_BYTES * 2
+    hits = [vector is not None for vector in cache.get_many(MODEL, ["satu", "dua", "tiga"])]
+    assert hits == [True, False, True]
+
+
+def test_cached_embeddings_only_embed_misses_once(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch)
+    model = CountingEmbeddings()
+    embeddings = CachedEmbeddings(model, cache, MODEL)
+    first = embeddings.embed_documents(["a", "bb", "a"])
+    second = embeddings.embed_documents(["bb", "ccc"])
+    assert model.calls == [["a", "bb"], ["ccc"]]
+    assert first[0] == first[2]
+    assert second[0] == first[1]
+    assert embeddings.embed_query("ccc") == second[1]
+    assert model.calls == [["a", "bb"], ["ccc"]]
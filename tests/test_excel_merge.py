@@ -0,0 +1,52 @@
+import pandas as pd
+
+from excel_merge import TEMPLATE_COLUMNS, Template, select_new_rows
+
+
+def make_row(tanggal, agenda, lokasi="Gedung Bumi Patra"):
+    return {
+        "HARI": "", "TANGGAL": tanggal, "AGENDA": agenda, "LOKASI": lokasi, "REQUESTOR": "HR",
+        "LAYANAN": "Sound System", "TYPE_ACARA": "", "SITE": "Bumi Patra", "WORKING_HOUR": "Yes",
+    }
+
+
+def make_template(rows, numbers):
+    df = pd.DataFrame(rows)
+    df.insert(0, "NO", numbers)
+    return Template(df.reindex(columns=TEMPLATE_COLUMNS), content_hash="template")
+
+
+def test_rows_already_in_the_template_are_skipped():
+    template = make_template([make_row("01 May 2025", "Rapat K3"), make_row("02 May 2025", "Town Hall")], [1, 7])
+    generated = pd.DataFrame([
+        # Case and surrounding spaces do not make a row new
+        make_row("01 May 2025", "  rapat k3 "),
+        make_row("03 May 2025", "Pelatihan"),
+    ])
+    new_rows = select_new_rows(template, generated)
+    assert list(new_rows.columns) == TEMPLATE_COLUMNS
+    assert list(new_rows["AGENDA"]) == ["Pelatihan"]
+    assert list(new_rows["NO"]) == [8]
+
+
+def test_duplicates_within_the_batch_are_kept_once():
+    template = make_template([make_row("01 May 2025", "Rapat K3")], [1])
+    generated = pd.DataFrame([
+        make_row("03 May 2025", "Pelatihan"),
+        make_row("03 May 2025", "Pelatihan"),
+        make_row("03 May 2025", "Pelatihan", lokasi="Auditorium Office RU VI"),
+    ])
+    new_rows = select_new_rows(template, generated)
+    assert list(new_rows["LOKASI"]) == ["Gedung Bumi Patra", "Auditorium Office RU VI"]
+    assert list(new_rows["NO"]) == [2, 3]
+
+
+def test_empty_template_numbers_from_one():
+    template = make_template([], [])
+    new_rows = select_new_rows(template, pd.DataFrame([make_row("03 May 2025", "Pelatihan")]))
+    assert list(new_rows["NO"]) == [1]
+
+
+def test_nothing_generated():
+    template = make_template([make_row("01 May 2025", "Rapat K3")], [1])
+    assert select_new_rows(template, pd.DataFrame()).empty
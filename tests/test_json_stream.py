@@ -0,0 +1,38 @@
+from json_stream import JSONObjectStream, iter_json_objects
+
+
+def feed_all(pieces):
+    stream = JSONObjectStream()
+    return [obj for piece in pieces for obj in stream.feed(piece)]
+
+
+def test_objects_split_across_chunks():
+    text = '```json\n[{"AGENDA": "Rapat", "LOKASI": "Gedung"}, {"AGENDA": "Pelatihan"}]\n```'
+    for size in (1, 2, 7):
+        pieces = [text[start:start + size] for start in range(0, len(text), size)]
+        assert feed_all(pieces) == [{"AGENDA": "Rapat", "LOKASI": "Gedung"}, {"AGENDA": "Pelatihan"}]
+
+
+def test_each_object_is_returned_by_the_chunk_that_completes_it():
+    stream = JSONObjectStream()
+    assert stream.feed('[{"A": 1}, {"B"') == [{"A": 1}]
+    assert stream.feed(': 2}]') == [{"B": 2}]
+
+
+def test_braces_and_escaped_quotes_inside_strings():
+    text = r'[{"AGENDA": "Rapat {tahunan} \"K3\" }", "LOKASI": "Ruang \\ A"}]'
+    assert feed_all([text[:20], text[20:]]) == [{"AGENDA": 'Rapat {tahunan} "K3" }', "LOKASI": "Ruang \\ A"}]
+
+
+def test_nested_objects_are_returned_whole():
+    assert iter_json_objects('Hasil: {"row": {"TANGGAL": "01 Mei 2025"}} selesai') == [
+        {"row": {"TANGGAL": "01 Mei 2025"}}
+    ]
+
+
+def test_truncated_tail_is_not_returned():
+    assert feed_all(['[{"AGENDA": "Rapat"}, {"AGENDA": "Pela']) == [{"AGENDA": "Rapat"}]
+
+
+def test_invalid_objects_are_skipped():
+    assert iter_json_objects('[{"AGENDA": Rapat}, {"AGENDA": "Rapat"}]') == [{"AGENDA": "Rapat"}]
@@ -0,0 +1,78 @@
+import pandas as pd
+
+from postprocess import MAX_EVENT_DAYS, expand_row, expand_rows, parse_dates, split_ranges
+
+COLUMNS = ["HARI", "TANGGAL", "AGENDA"]
+
+
+def test_parse_dates_reads_indonesian_months_and_day_prefixes():
+    dates = parse_dates([
+        "02 Januari 2025",
+        "Senin, 3 Pebruari 2025",
+        "Senin s.d. Rabu, 10 Maret 2025",
+        "2025-04-01",
+        "05/06/2025",
+        "bukan tanggal",
+        None,
+    ])
+    expected = ["2025-01-02", "2025-02-03", "2025-03-10", "2025-04-01", "2025-06-05"]
+    assert list(dates[:5]) == [pd.Timestamp(day) for day in expected]
+    assert dates[5:].isna().all()
+
+
+def test_split_ranges_borrows_month_and_year_from_the_end():
+    start, end = split_ranges(pd.Series(["02 - 04 Januari 2025", "30 Desember 2024 s.d. 02 Januari 2025", "05 Mei 2025"]))
+    assert list(start) == [pd.Timestamp("2025-01-02"), pd.Timestamp("2024-12-30"), pd.Timestamp("2025-05-05")]
+    assert list(end[:2]) == [pd.Timestamp("2025-01-04"), pd.Timestamp("2025-01-02")]
+    assert pd.isna(end[2])
+
+
+def test_expand_rows_gives_one_row_per_day_with_its_hari():
+    df = pd.DataFrame([{"TANGGAL": "Senin, 06 Januari 2025", "TANGGAL_SELESAI": "08 Januari 2025", "AGENDA": "Rapat"}])
+    rows = expand_rows(df, COLUMNS)
+    assert rows.to_dict("records") == [
+        {"HARI": "Senin", "TANGGAL": "06 January 2025", "AGENDA": "Rapat"},
+        {"HARI": "Selasa", "TANGGAL": "07 January 2025", "AGENDA": "Rapat"},
+        {"HARI": "Rabu", "TANGGAL": "08 January 2025", "AGENDA": "Rapat"},
+    ]
+
+
+def test_expand_rows_expands_ranges_written_in_tanggal():
+    df = pd.DataFrame([{"TANGGAL": "10 - 11 Februari 2025", "AGENDA": "Pelatihan"}])
+    rows = expand_rows(df, COLUMNS)
+    assert list(rows["TANGGAL"]) == ["10 February 2025", "11 February 2025"]
+    assert list(rows["HARI"]) == ["Senin", "Selasa"]
+
+
+def test_expand_rows_swaps_backwards_ranges():
+    df = pd.DataFrame([{"TANGGAL": "08 Januari 2025", "TANGGAL_SELESAI": "06 Januari 2025", "AGENDA": "Rapat"}])
+    rows = expand_rows(df, COLUMNS)
+    assert list(rows["TANGGAL"]) == ["06 January 2025", "07 January 2025", "08 January 2025"]
+
+
+def test_expand_rows_leaves_unparsable_tanggal_unexpanded():
+    df = pd.DataFrame([{"TANGGAL": "menyesuaikan", "TANGGAL_SELESAI": "08 Januari 2025", "HARI": "", "AGENDA": "Rapat"}])
+    rows = expand_rows(df, COLUMNS)
+    assert rows.to_dict("records") == [{"HARI": "", "TANGGAL": "menyesuaikan", "AGENDA": "Rapat"}]
+
+
+def test_expand_rows_keeps_ranges_over_max_event_days_as_one_row():
+    start = pd.Timestamp("2025-01-01")
+    end = start + pd.Timedelta(days=MAX_EVENT_DAYS)
+    df = pd.DataFrame([{
+        "TANGGAL": start.strftime("%d %B %Y"), "TANGGAL_SELESAI": end.strftime("%d %B %Y"), "AGENDA": "Rapat"
+    }])
+    rows = expand_rows(df, COLUMNS)
+    assert rows.to_dict("records") == [{"HARI": "Rabu", "TANGGAL": "01 January 2025", "AGENDA": "Rapat"}]
+
+
+def test_expand_rows_expands_exactly_max_event_days():
+    start = pd.Timestamp("2025-01-01")
+    end = start + pd.Timedelta(days=MAX_EVENT_DAYS - 1)
+    df = pd.DataFrame([{"TANGGAL": start.strftime("%d %B %Y"), "TANGGAL_SELESAI": end.strftime("%d %B %Y")}])
+    assert len(expand_rows(df)) == MAX_EVENT_DAYS
+
+
+def test_expand_row_returns_plain_dicts():
+    rows = expand_row({"TANGGAL": "Jumat, 07 Maret 2025", "TANGGAL_SELESAI": "", "AGENDA": "Rapat"}, COLUMNS)
+    assert rows == [{"HARI": "Jumat", "TANGGAL": "07 March 2025", "AGENDA": "Rapat"}]
@@ -0,0 +1,68 @@
+import json
+
+import result_cache
+from result_cache import ExtractionResultCache, make_result_key
+
+ROWS = [{"TANGGAL": "01 May 2025", "AGENDA": "Rapat"}]
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(tmp_path, monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(result_cache.time, "time", clock)
+    return ExtractionResultCache(str(tmp_path / "results.sqlite"), **kwargs), clock
+
+
+def test_result_key_changes_with_every_input():
+    key = make_result_key("a" * 64, "prompt", "query", "model", "ingestion")
+    assert key == make_result_key("a" * 64, "prompt", "query", "model", "ingestion")
+    assert key != make_result_key("b" * 64, "prompt", "query", "model", "ingestion")
+    assert key != make_result_key("a" * 64, "prompt 2", "query", "model", "ingestion")
+    assert key != make_result_key("a" * 64, "prompt", "query 2", "model", "ingestion")
+    assert key != make_result_key("a" * 64, "prompt", "query", "model 2", "ingestion")
+    # Another chunking strategy gives the model another context
+    assert key != make_result_key("a" * 64, "prompt", "query", "model", "ingestion 2")
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, ttl_seconds=60)
+    cache.put("key", "doc", ROWS)
+    clock.now += 59
+    assert cache.get("key") == ROWS
+    clock.now += 2
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted_over_max_bytes(tmp_path, monkeypatch):
+    entry_bytes = len(json.dumps(ROWS))
+    cache, clock = make_cache(tmp_path, monkeypatch, max_bytes=entry_bytes * 2)
+    cache.put("first", "doc", ROWS)
+    clock.now += 1
+    cache.put("second", "doc", ROWS)
+    clock.now += 1
+    # Reading "first" makes "second" the least recently used
+    assert cache.get("first") == ROWS
+    clock.now += 1
+    cache.put("third", "doc", ROWS)
+    assert cache.get("second") is None
+    assert cache.get("first") == ROWS
+    assert cache.get("third") == ROWS
+    assert cache.stats()["size_bytes"] <= entry_bytes * 2
+
+
+def test_invalidate_drops_only_that_document(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch)
+    cache.put("one", "doc-1", ROWS)
+    cache.put("two", "doc-2", ROWS)
+    assert cache.invalidate("doc-1") == 1
+    assert cache.get("one") is None
+    assert cache.get("two") == ROWS
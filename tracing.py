@@ -0,0 +1,156 @@
+import os
+import time
+import logging
+import contextvars
+from contextlib import contextmanager, nullcontext
+from langchain_core.callbacks import BaseCallbackHandler
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING").upper()
+
+logger = logging.getLogger("rag_app")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(handler)
+logger.setLevel(LOG_LEVEL)
+
+# Spans only reach an exporter if an OpenTelemetry SDK is configured (e.g. via
+# opentelemetry-instrument); otherwise the API's tracer is a no-op
+_tracer = otel_trace.get_tracer("rag_app") if otel_trace is not None else None
+_current_run = contextvars.ContextVar("rag_app_run", default=None)
+
+
+class RunTrace:
+    """
+    The spans recorded during one pipeline run, e.g. one ingestion or extraction.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.time()
+        self.duration_ms = None
+        self.spans = []
+
+    def add(self, name, duration_ms, attributes):
+        self.spans.append({"stage": name, "ms": round(duration_ms, 2), **attributes})
+
+    def to_rows(self):
+        return list(self.spans)
+
+
+def current_run():
+    """
+    Return the RunTrace of the enclosing start_run block, if any.
+    """
+    return _current_run.get()
+
+
+def record(name, duration_ms, **attributes):
+    """
+    Record a finished span of known duration on the current run and in the log.
+    """
+    run = _current_run.get()
+    if run is not None:
+        run.add(name, duration_ms, attributes)
+    logger.debug("%s %.1fms %s", name, duration_ms, attributes)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a pipeline stage.
+
+    The yielded dict can be updated inside the block with token counts,
+    cache hit flags and the like; they are attached to the span on exit.
+    """
+    attrs = dict(attributes)
+    start = time.perf_counter()
+    otel_context = _tracer.start_as_current_span(name) if _tracer is not None else nullcontext()
+    with otel_context as otel_span:
+        try:
+            yield attrs
+        except Exception as e:
+            attrs["error"] = repr(e)
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if otel_span is not None:
+                for key, value in attrs.items():
+                    if isinstance(value, (str, bool, int, float)):
+                        otel_span.set_attribute(key, value)
+            record(name, duration_ms, **attrs)
+
+
+@contextmanager
+def start_run(name, **attributes):
+    """
+    Collect every span recorded in the block into a new RunTrace.
+
+    :return: A context manager yielding the RunTrace
+    """
+    run = RunTrace(name)
+    token = _current_run.set(run)
+    start = time.perf_counter()
+    try:
+        with span(name, **attributes):
+            yield run
+    finally:
+        run.duration_ms = (time.perf_counter() - start) * 1000
+        _current_run.reset(token)
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain callback handler that records retriever and LLM calls as spans.
+    """
+
+    # Keep callbacks on the caller's thread/task so they see the current run
+    run_inline = True
+
+    def __init__(self):
+        self._starts = {}
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            record("retrieve", (time.perf_counter() - start) * 1000, documents=len(documents))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self._starts.pop(run_id, None)
+        if start is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_tokens")
+        completion_tokens = usage.get("completion_tokens")
+        if prompt_tokens is None and response.generations and response.generations[0]:
+            message = getattr(response.generations[0][0], "message", None)
+            usage_metadata = getattr(message, "usage_metadata", None) or {}
+            prompt_tokens = usage_metadata.get("input_tokens")
+            completion_tokens = usage_metadata.get("output_tokens")
+        record(
+            "llm_call",
+            (time.perf_counter() - start) * 1000,
+            prompt_tokens=prompt_tokens or 0,
+            completion_tokens=completion_tokens or 0
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            record("llm_call", (time.perf_counter() - start) * 1000, error=repr(error))
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            record("retrieve", (time.perf_counter() - start) * 1000, error=repr(error))
@@ -0,0 +1,210 @@
+import os
+import hashlib
+import weakref
+import tempfile
+import threading
+
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "rag_uploads"))
+UPLOAD_SPOOL_MAX_MB = int(os.getenv("UPLOAD_SPOOL_MAX_MB", "2048"))
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+_cleanup_lock = threading.Lock()
+# Uploads still referenced in this process; cleanup_spool never deletes their files
+_live_uploads = weakref.WeakSet()
+
+
+class SpooledUpload:
+    """
+    An upload written once to a content-addressed file on disk.
+
+    PyMuPDF opens the file by path and pages it in as needed, and downloads
+    are streamed from it, so nothing downstream holds another copy of the
+    bytes. Identical uploads from different sessions share one file, which
+    cleanup_spool keeps for as long as any of them is referenced.
+    """
+
+    def __init__(self, path, name, content_hash, size):
+        self.path = path
+        self.name = name
+        self.content_hash = content_hash
+        self.size = size
+        _live_uploads.add(self)
+
+    def touch(self):
+        """
+        Mark the file as just used, so cleanup_spool in other processes evicts it last.
+        """
+        try:
+            os.utime(self.path)
+        except OSError:
+            pass
+
+    def open(self):
+        """
+        Return a binary file object of the spooled content.
+        """
+        return open(self.path, "rb")
+
+    def iter_chunks(self, chunk_size=SPOOL_CHUNK_BYTES):
+        """
+        Yield the content in chunks, for streaming responses.
+        """
+        with self.open() as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def getvalue(self):
+        # For callers that still need the bytes, e.g. small files; reads the whole file
+        with self.open() as f:
+            return f.read()
+
+
+def _iter_source(source, chunk_size):
+    # Streamlit's UploadedFile is a BytesIO: slicing its buffer avoids copying the whole upload
+    if hasattr(source, "getbuffer"):
+        buffer = source.getbuffer()
+        try:
+            for start in range(0, len(buffer), chunk_size):
+                yield buffer[start:start + chunk_size]
+        finally:
+            buffer.release()
+        return
+    if hasattr(source, "seek"):
+        source.seek(0)
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def hash_file(source, chunk_size=SPOOL_CHUNK_BYTES):
+    """
+    Return the SHA-256 hex digest of a file-like object, hashing it in chunks.
+    """
+    digest = hashlib.sha256()
+    for chunk in _iter_source(source, chunk_size):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _spool_path(content_hash, directory):
+    return os.path.join(directory, content_hash)
+
+
+def _publish(temp_path, content_hash, size, name, directory):
+    # Content-addressed, so a second upload of the same file just refreshes the first one
+    path = _spool_path(content_hash, directory)
+    if os.path.exists(path):
+        os.remove(temp_path)
+        os.utime(path)
+    else:
+        os.replace(temp_path, path)
+    cleanup_spool(directory, keep=path)
+    return SpooledUpload(path, name, content_hash, size)
+
+
+def spool_chunks(chunks, name, directory=UPLOAD_SPOOL_DIR):
+    """
+    Write an iterable of byte chunks to the spool, hashing them on the way.
+
+    :param chunks: An iterable of bytes-like objects
+    :param name: The original file name
+    :param directory: The spool directory
+
+    :return: A SpooledUpload
+    """
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return _publish(temp_path, digest.hexdigest(), size, name, directory)
+
+
+def spool_upload(uploaded_file, directory=UPLOAD_SPOOL_DIR):
+    """
+    Spool a file-like upload (e.g. a Streamlit UploadedFile) to disk in chunks.
+    """
+    return spool_chunks(_iter_source(uploaded_file, SPOOL_CHUNK_BYTES), uploaded_file.name, directory)
+
+
+async def aspool_stream(stream, name, directory=UPLOAD_SPOOL_DIR):
+    """
+    Spool an async iterator of byte chunks, e.g. a request body, without holding it in memory.
+    """
+    import asyncio
+
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in stream:
+                digest.update(chunk)
+                # Disk writes happen off the event loop
+                await asyncio.to_thread(f.write, chunk)
+                size += len(chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return _publish(temp_path, digest.hexdigest(), size, name, directory)
+
+
+def find_spooled(content_hash, name="document.pdf", directory=UPLOAD_SPOOL_DIR):
+    """
+    Return the SpooledUpload of a content hash if its file is still in the spool, else None.
+    """
+    path = _spool_path(content_hash, directory)
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return None
+    spooled = SpooledUpload(path, name, content_hash, size)
+    spooled.touch()
+    return spooled
+
+
+def cleanup_spool(directory=UPLOAD_SPOOL_DIR, max_bytes=UPLOAD_SPOOL_MAX_MB * 1024 * 1024, keep=None):
+    """
+    Delete the least recently used files once the spool exceeds max_bytes.
+
+    Files of uploads still referenced in this process are skipped.
+
+    :param keep: Path of a file that must survive, e.g. the one just spooled
+
+    :return: The number of files removed
+    """
+    with _cleanup_lock:
+        referenced = {upload.path for upload in list(_live_uploads)}
+        entries = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and not entry.name.endswith(".part"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            if path == keep or path in referenced:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
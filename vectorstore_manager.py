@@ -0,0 +1,233 @@
+import os
+import re
+import time
+import shutil
+import sqlite3
+import threading
+
+from sqlite_compat import use_modern_sqlite
+
+# Chroma names its vector segment directories after segment UUIDs
+SEGMENT_DIR_PATTERN = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+COLLECTION_PREFIX = "pdf_"
+# Length of the content hash kept in a collection name; Chroma allows at most 63 characters
+COLLECTION_HASH_CHARS = 56
+
+
+def collection_name(content_hash):
+    """
+    Return the Chroma collection name of a PDF content hash.
+    """
+    return COLLECTION_PREFIX + content_hash[:COLLECTION_HASH_CHARS]
+
+
+class VectorStoreManager:
+    """
+    One process-wide Chroma client plus a registry of the collections it holds.
+
+    Collections are named after the PDF content hash, so two uploads with the
+    same name never collide and re-uploads of the same bytes share one
+    collection. The registry (a small SQLite file next to the Chroma store)
+    records each collection's approximate size and last access; gc drops the
+    least recently used ones beyond max_collections or max_bytes and the ones
+    idle for longer than max_age_seconds, and compact reclaims their disk space.
+    """
+
+    def __init__(self, path, max_collections=200, max_bytes=512 * 1024 * 1024, max_age_seconds=30 * 24 * 3600):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.max_collections = max_collections
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._client = None
+        self._vectorstores = {}
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(path, "collections.sqlite"), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS collections (
+                name TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                file_name TEXT,
+                chunks INTEGER NOT NULL,
+                bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_collections_last_access ON collections (last_access)")
+        self._conn.commit()
+
+    @property
+    def client(self):
+        """
+        The shared chromadb PersistentClient, created on first use.
+        """
+        with self._lock:
+            if self._client is None:
+                use_modern_sqlite()
+                import chromadb
+                self._client = chromadb.PersistentClient(path=self.path)
+            return self._client
+
+    def get_collection(self, name):
+        """
+        Return an existing chromadb Collection without creating it, or None.
+        """
+        try:
+            return self.client.get_collection(name)
+        except Exception:
+            return None
+
+    def get_vectorstore(self, name, embedding_function):
+        """
+        Return the LangChain Chroma wrapper of a collection, creating the collection if needed.
+
+        Wrappers are reused, so repeated lookups of a collection return the same object.
+        """
+        with self._lock:
+            vectorstore = self._vectorstores.get(name)
+            if vectorstore is None or vectorstore._embedding_function is not embedding_function:
+                from langchain.vectorstores import Chroma
+                vectorstore = Chroma(
+                    client=self.client,
+                    collection_name=name,
+                    embedding_function=embedding_function
+                )
+                self._vectorstores[name] = vectorstore
+            return vectorstore
+
+    def register(self, name, content_hash, file_name=None):
+        """
+        Record (or refresh) a collection's size in the registry after it was written.
+        """
+        collection = self.client.get_collection(name)
+        chunks = collection.count()
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO collections (name, content_hash, file_name, chunks, bytes, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET file_name = excluded.file_name, chunks = excluded.chunks, "
+                "bytes = excluded.bytes, last_access = excluded.last_access",
+                (name, content_hash, file_name, chunks, self._estimate_bytes(collection, chunks), now, now)
+            )
+            self._conn.commit()
+
+    def touch(self, name):
+        """
+        Mark a collection as just used.
+
+        :return: False if the collection is not in the registry, e.g. because gc deleted it
+        """
+        with self._lock:
+            cursor = self._conn.execute("UPDATE collections SET last_access = ? WHERE name = ?", (time.time(), name))
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def is_open(self, name, vectorstore):
+        """
+        Whether a wrapper returned by get_vectorstore still points at the live collection.
+
+        A collection deleted by gc and written again gets a new id, so wrappers
+        handed out before the deletion stay broken even though the name exists.
+        """
+        with self._lock:
+            return self._vectorstores.get(name) is vectorstore
+
+    def _estimate_bytes(self, collection, chunks):
+        if not chunks:
+            return 0
+        sample = collection.get(limit=1, include=["embeddings"])
+        dimensions = len(sample["embeddings"][0]) if len(sample["embeddings"]) else 0
+        documents = collection.get(include=["documents"])["documents"]
+        # float32 vectors plus the stored chunk text
+        return chunks * dimensions * 4 + sum(len(text.encode("utf-8")) for text in documents if text)
+
+    def delete(self, name):
+        """
+        Drop a collection from Chroma and from the registry.
+        """
+        with self._lock:
+            self._vectorstores.pop(name, None)
+            try:
+                self.client.delete_collection(name)
+            except Exception:
+                pass
+            self._conn.execute("DELETE FROM collections WHERE name = ?", (name,))
+            self._conn.commit()
+
+    def gc(self, keep=()):
+        """
+        Delete idle collections and the least recently used ones over the limits.
+
+        :param keep: Names of collections that must survive, e.g. the one just written
+
+        :return: The names of the deleted collections
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, bytes, last_access FROM collections ORDER BY last_access"
+            ).fetchall()
+            count = len(rows)
+            size = sum(row[1] for row in rows)
+            victims = []
+            for name, length, last_access in rows:
+                if name in keep:
+                    continue
+                if now - last_access > self.max_age_seconds or count > self.max_collections or size > self.max_bytes:
+                    victims.append(name)
+                    count -= 1
+                    size -= length
+            for name in victims:
+                self.delete(name)
+        return victims
+
+    def compact(self):
+        """
+        Reclaim disk space: remove segment directories of deleted collections and VACUUM Chroma's SQLite file.
+
+        :return: A dict with the number of directories removed and bytes freed
+        """
+        chroma_db = os.path.join(self.path, "chroma.sqlite3")
+        if not os.path.exists(chroma_db):
+            return {"segments_removed": 0, "bytes_freed": 0}
+        before = self.disk_usage()
+        with self._lock:
+            use_modern_sqlite()
+            # Imported here so the connection uses the same SQLite library as Chroma
+            import sqlite3 as chroma_sqlite
+            conn = chroma_sqlite.connect(chroma_db)
+            try:
+                live_segments = {row[0] for row in conn.execute("SELECT id FROM segments")}
+                removed = 0
+                for entry in os.listdir(self.path):
+                    full_path = os.path.join(self.path, entry)
+                    if SEGMENT_DIR_PATTERN.match(entry) and os.path.isdir(full_path) and entry not in live_segments:
+                        shutil.rmtree(full_path, ignore_errors=True)
+                        removed += 1
+                conn.execute("VACUUM")
+            finally:
+                conn.close()
+            self._conn.execute("VACUUM")
+        return {"segments_removed": removed, "bytes_freed": max(0, before - self.disk_usage())}
+
+    def disk_usage(self):
+        """
+        Return the bytes used on disk by the store directory, caches kept there included.
+        """
+        total = 0
+        for root, _, files in os.walk(self.path):
+            for file_name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, file_name))
+                except OSError:
+                    pass
+        return total
+
+    def stats(self):
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM collections"
+            ).fetchone()
+        return {"collections": count, "bytes": size, "disk_bytes": self.disk_usage(), "open_wrappers": len(self._vectorstores)}